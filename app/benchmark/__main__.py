@@ -0,0 +1,300 @@
+"""
+Stage-level benchmarks on a synthetic corpus.
+
+    python -m app.benchmark generate --jobs 10000 --data-dir bench/data
+    python -m app.benchmark run --data-dir bench/data --output bench/base.json
+    python -m app.benchmark compare bench/base.json bench/new.json
+
+Nothing here needs the Excel sheet, a Qdrant server or a Groq key: the
+corpus is generated, Qdrant runs in memory and the LLM is faked. The
+embedding and reranker models run for real, as they run in process.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+STAGES = ['search_bm25', 'semantic_search', 'fuse_results', 'perform_hybrid_search', 'rerank_jobs', 'run_pipeline']
+
+
+def configure_environment(data_dir: Path, vector_backend: str) -> None:
+    """Point settings at the benchmark data, before any app module reads them."""
+    data_dir = data_dir.resolve()
+    os.environ.update({
+        'DATA_DIR': str(data_dir),
+        'RAW_DATA_DIR': str(data_dir / 'raw'),
+        'PROCESSED_DATA_DIR': str(data_dir / 'processed'),
+        'CHUNKED_DATA_DIR': str(data_dir / 'chunks'),
+        'EMBEDDINGS_DATA_DIR': str(data_dir / 'embeddings'),
+        'KEYWORD_RETRIEVER_DIR': str(data_dir / 'keyword_retriever'),
+        'VECTOR_BACKEND': vector_backend,
+        # Every query must run the stages, not hit a cached answer
+        'RESULT_CACHE_ENABLED': 'false',
+    })
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process now, or the peak where /proc is missing."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Sample the resident set size on a background thread while a stage runs.
+
+    `delta_mb` is how far RSS rose above its value at the start, so a stage
+    is not charged for the memory every earlier stage left behind.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.delta_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.delta_mb = max(self.delta_mb, current_rss_mb() - self._start)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> 'RssSampler':
+        self._start = current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.delta_mb = max(self.delta_mb, current_rss_mb() - self._start)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn: Callable[[Any], Any], inputs: List[Any], warmup: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Time `fn` over `inputs` after `warmup` untimed calls.
+
+    With concurrency above 1, calls run on that many threads and throughput
+    is measured over the wall time of the whole run.
+    """
+    for item in inputs[:warmup]:
+        fn(item)
+
+    def timed(item) -> float:
+        started = time.perf_counter()
+        fn(item)
+        return (time.perf_counter() - started) * 1000
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed, inputs))
+        else:
+            latencies = [timed(item) for item in inputs]
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'max_ms': round(latencies[-1], 3),
+        'throughput_per_s': round(len(latencies) / wall, 2),
+        'rss_delta_mb': round(rss.delta_mb, 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def generate(args) -> None:
+    configure_environment(args.data_dir, 'local')
+    from app.benchmark.corpus import write_corpus
+
+    summary = write_corpus(args.jobs, seed=args.seed, model_embeddings=args.model_embeddings)
+    print(json.dumps(summary, indent=2))
+
+
+def run(args) -> Dict[str, Any]:
+    configure_environment(args.data_dir, args.vector_backend)
+    from app.config import settings
+    from app.benchmark.corpus import generate_queries
+    from app.benchmark.stand_ins import install_fake_llm, install_in_memory_qdrant
+    from app.services.keyword_retriever import search_bm25
+    from app.services.vector_retriever import semantic_search
+    from app.services.hybrid_search import perform_hybrid_search, fuse_results
+    from app.services.reranker import rerank_jobs
+    from app.inference_pipeline import run_pipeline
+    from app.utils.chunk_store import get_chunk_store
+    from app.utils.resources import registry
+
+    baseline_rss = peak_rss_mb()
+    if settings.vector_backend == 'qdrant':
+        install_in_memory_qdrant()
+    elif settings.vector_backend == 'binary':
+        from app.utils.binary_index import binary_embeddings_path, build_binary_index
+        if not binary_embeddings_path.exists():
+            build_binary_index()
+    install_fake_llm(args.llm_latency_ms)
+
+    # Load models and indexes up front, so the first timed calls don't pay for it
+    started = time.perf_counter()
+    registry.warm_up()
+    warmup_seconds = time.perf_counter() - started
+
+    queries = generate_queries(args.queries + args.warmup, seed=args.seed)
+    candidates = {query: perform_hybrid_search(query)[0] for query in queries} if 'rerank_jobs' in args.stages else {}
+    retrieved = {query: (search_bm25(query), semantic_search(query)) for query in queries} if 'fuse_results' in args.stages else {}
+
+    stage_fns = {
+        'search_bm25': search_bm25,
+        'semantic_search': semantic_search,
+        'fuse_results': lambda query: fuse_results(*retrieved[query]),
+        'perform_hybrid_search': perform_hybrid_search,
+        'rerank_jobs': lambda query: rerank_jobs(job_ids=candidates[query], query=query),
+        'run_pipeline': run_pipeline,
+    }
+
+    stages = {}
+    for stage in args.stages:
+        # The pipeline is dominated by the fake LLM latency, so it gets fewer calls
+        stage_queries = queries if stage != 'run_pipeline' else queries[:args.warmup + args.pipeline_queries]
+        concurrency = args.concurrency if stage == 'run_pipeline' else 1
+        stages[stage] = measure(stage_fns[stage], stage_queries, args.warmup, concurrency)
+        print(f'{stage:>22}: p50 {stages[stage]["p50_ms"]:.2f}ms  p95 {stages[stage]["p95_ms"]:.2f}ms  '
+              f'p99 {stages[stage]["p99_ms"]:.2f}ms  {stages[stage]["throughput_per_s"]:.1f}/s', file=sys.stderr)
+
+    return {
+        'config': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'chunks': len(get_chunk_store()),
+            'vector_backend': settings.vector_backend,
+            'inference_backend': settings.inference_backend,
+            'micro_batch_enabled': settings.micro_batch_enabled,
+            'llm_latency_ms': args.llm_latency_ms,
+            'queries': args.queries,
+            'warmup': args.warmup,
+        },
+        'startup': {
+            'baseline_rss_mb': round(baseline_rss, 1),
+            'warmup_seconds': round(warmup_seconds, 2),
+        },
+        'stages': stages,
+    }
+
+
+def compare(args) -> int:
+    """
+    Print the change of every stage's latencies and throughput, return 1 on a regression.
+
+    Memory is left out: RSS depends on what ran earlier in the process and
+    on allocator timing, too noisy for a relative threshold.
+    """
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['stages']
+    with open(args.candidate, 'r', encoding='utf-8') as f:
+        candidate = json.load(f)['stages']
+
+    regressions = []
+    print(f'{"stage":>22} {"metric":>16} {"baseline":>10} {"candidate":>10} {"change":>8}')
+    for stage in [stage for stage in baseline if stage in candidate]:
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s'):
+            old, new = baseline[stage][metric], candidate[stage][metric]
+            change = (new - old) / old if old else 0.0
+            # Higher is worse for latencies, lower is worse for throughput
+            worse = -change if metric == 'throughput_per_s' else change
+            flag = ''
+            if worse > args.tolerance:
+                flag = '  REGRESSION'
+                regressions.append(f'{stage}.{metric}')
+            print(f'{stage:>22} {metric:>16} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}')
+
+    if regressions:
+        print(f'\n{len(regressions)} regressions above {args.tolerance:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the query pipeline stages on a synthetic corpus')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='Write a synthetic corpus and its indexes')
+    generate_parser.add_argument('--jobs', type=int, default=10000, help='Number of jobs, 1k to 1M')
+    generate_parser.add_argument('--data-dir', type=Path, default=Path('bench/data'))
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.add_argument('--model-embeddings', action='store_true',
+                                 help='Embed chunks with the model instead of synthetic vectors')
+
+    run_parser = commands.add_parser('run', help='Benchmark every stage and report JSON')
+    run_parser.add_argument('--data-dir', type=Path, default=Path('bench/data'))
+    run_parser.add_argument('--vector-backend', default='qdrant', choices=['qdrant', 'local', 'binary'])
+    run_parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    run_parser.add_argument('--queries', type=int, default=200, help='Timed calls per stage')
+    run_parser.add_argument('--pipeline-queries', type=int, default=50, help='Timed calls of run_pipeline')
+    run_parser.add_argument('--warmup', type=int, default=10, help='Untimed calls per stage')
+    run_parser.add_argument('--concurrency', type=int, default=1, help='Concurrent run_pipeline calls')
+    run_parser.add_argument('--llm-latency-ms', type=float, default=800.0, help='Latency of the fake LLM')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--output', type=Path, default=None, help='Write the report here instead of stdout')
+
+    compare_parser = commands.add_parser('compare', help='Compare two reports')
+    compare_parser.add_argument('baseline', type=Path)
+    compare_parser.add_argument('candidate', type=Path)
+    compare_parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate(args)
+    elif args.command == 'run':
+        report = run(args)
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+    elif args.command == 'compare':
+        return compare(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import random
+import time
+from array import array
+from typing import Any, Dict, Iterator, List
+import numpy as np
+from app.services.embeddings import embed_path
+from app.utils.bm25 import BM25Builder, preprocess_text_for_bm25, keyword_retriever_path
+from app.utils.chunker import generate_chunks, chunked_data_path
+from app.utils.job_store import prepare_job_text, processed_data_path, job_texts_path
+from app.utils.json_writer import JsonArrayWriter, JsonObjectWriter
+from app.config import settings
+from app.config import logger
+
+TITLES = [
+    'Data Scientist', 'Machine Learning Engineer', 'Software Engineer', 'Backend Developer',
+    'Frontend Developer', 'DevOps Engineer', 'Data Engineer', 'Product Manager', 'UX Designer',
+    'Registered Nurse', 'Physician Assistant', 'Pharmacist', 'Accountant', 'Financial Analyst',
+    'Sales Representative', 'Marketing Manager', 'Customer Success Manager', 'HR Generalist',
+    'Mechanical Engineer', 'Electrical Engineer', 'Civil Engineer', 'Teacher', 'Project Manager',
+    'Business Analyst', 'Security Engineer', 'Cloud Architect', 'QA Engineer', 'Technical Writer',
+]
+SENIORITIES = ['Junior', 'Mid-Level', 'Senior', 'Lead', 'Principal']
+LEVELS = ['Entry Level', 'Mid Level', 'Senior Level', 'Management']
+CATEGORIES = [
+    'Software Engineering', 'Data and Analytics', 'Healthcare', 'Finance', 'Sales',
+    'Marketing', 'Human Resources', 'Engineering', 'Education', 'Design',
+]
+LOCATIONS = [
+    ('New York', 'NY'), ('San Francisco', 'CA'), ('Austin', 'TX'), ('Seattle', 'WA'),
+    ('Chicago', 'IL'), ('Boston', 'MA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('Miami', 'FL'),
+]
+SKILLS = [
+    'python', 'sql', 'java', 'kubernetes', 'aws', 'react', 'statistics', 'excel', 'tableau',
+    'spark', 'terraform', 'docker', 'patient care', 'budgeting', 'negotiation', 'seo', 'figma',
+    'cad', 'communication', 'leadership', 'pytorch', 'go', 'rust', 'typescript', 'compliance',
+]
+FILLER = (
+    'You will work with a cross functional team to deliver reliable results for our customers. '
+    'We value ownership, clear communication and continuous learning. '
+)
+
+
+def generate_job(i: int, rng: random.Random) -> Dict[str, Any]:
+    """A synthetic job in the schema of processed.json."""
+    title = rng.choice(TITLES)
+    seniority = rng.choice(SENIORITIES)
+    city, state = rng.choice(LOCATIONS)
+    is_remote = rng.random() < 0.3
+    skills = rng.sample(SKILLS, 5)
+
+    # Sections in the markdown layout the description cleaner produces, one chunk each
+    sections = {
+        'About the Role': f'{seniority} {title} joining our team in {city}. ' + FILLER * rng.randint(1, 4),
+        'Responsibilities': ' '.join(f'- Own {skill} work streams and deliverables.' for skill in skills[:3]),
+        'Requirements': f'{rng.randint(1, 10)}+ years of experience. Strong {skills[0]} and {skills[1]} skills. '
+                        + FILLER * rng.randint(0, 2),
+        'Nice to Have': f'Experience with {skills[3]} or {skills[4]}.',
+        'Benefits': 'Health insurance, 401k matching, flexible hours' + (', remote work.' if is_remote else '.'),
+    }
+    description = '\n\n'.join(f'**{name}**\n{text}' for name, text in sections.items())
+
+    return {
+        'ID': f'JB{i}',
+        'Job Title': f'{seniority} {title}',
+        'Company Name': f'Company {rng.randint(1, 5000)}',
+        'Job Location': {
+            'cities': [city],
+            'states': [state],
+            'countries': ['USA'],
+            'is_remote': is_remote,
+        },
+        'Job Level': rng.choice(LEVELS),
+        'Job Category': rng.choice(CATEGORIES),
+        'Tags': skills,
+        'Publication Date': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'Job Description': description,
+        'cleaned_title': title.lower(),
+    }
+
+
+def iter_jobs(n_jobs: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(n_jobs):
+        yield generate_job(i, rng)
+
+
+def generate_queries(n_queries: int, seed: int = 1) -> List[str]:
+    """Search queries resembling what users type, drawn from the corpus vocabulary."""
+    rng = random.Random(seed)
+    templates = [
+        lambda: f'{rng.choice(SENIORITIES).lower()} {rng.choice(TITLES).lower()}',
+        lambda: f'remote {rng.choice(TITLES).lower()} with {rng.choice(SKILLS)}',
+        lambda: f'{rng.choice(TITLES).lower()} jobs in {rng.choice(LOCATIONS)[0]}',
+        lambda: f'{rng.choice(SKILLS)} and {rng.choice(SKILLS)} {rng.choice(TITLES).lower()} {rng.randint(1, 8)}+ years',
+    ]
+    return [rng.choice(templates)() for _ in range(n_queries)]
+
+
+def _title_centres(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((len(TITLES), settings.embedding_dimension)).astype(np.float32)
+
+
+def _synthetic_embeddings(centres: np.ndarray, title_codes: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Unit vectors clustered by job title, standing in for model embeddings.
+
+    Chunks of the same title share a cluster centre, so vector search has
+    the score distribution of a topical corpus without running the model.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = centres[title_codes] + 0.8 * rng.standard_normal((len(title_codes), centres.shape[1])).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float16)
+
+
+def write_corpus(n_jobs: int, seed: int = 0, model_embeddings: bool = False) -> Dict[str, Any]:
+    """
+    Write a synthetic corpus with every artifact the query pipeline reads.
+
+    processed.json, job_texts.json, chunked.json, embeddings.npy and the BM25
+    index are written to the configured data directories, in the same
+    schemas as the ingestion pipeline. Jobs are generated and written one
+    at a time, so corpora of a million jobs fit in memory.
+
+    Args:
+        n_jobs: Number of jobs
+        seed: Random seed
+        model_embeddings: Embed the chunks with the embedding model instead
+            of synthetic vectors. Realistic, but slow for large corpora
+
+    Returns:
+        Summary of the corpus
+    """
+    started = time.perf_counter()
+    for path in (processed_data_path, chunked_data_path, embed_path, keyword_retriever_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    processed_writer = JsonArrayWriter(processed_data_path)
+    chunk_writer = JsonArrayWriter(chunked_data_path)
+    texts_writer = JsonObjectWriter(job_texts_path)
+    bm25_builder = BM25Builder()
+    title_index = {title.lower(): i for i, title in enumerate(TITLES)}
+    chunk_titles, chunk_contents = array('i'), []
+
+    for job in iter_jobs(n_jobs, seed):
+        processed_writer.write(job)
+        texts_writer.write_item(job['ID'], prepare_job_text(job))
+        for chunk in generate_chunks(job):
+            chunk_writer.write(chunk)
+            bm25_builder.add(preprocess_text_for_bm25(chunk['content']))
+            chunk_titles.append(title_index[job['cleaned_title']])
+            if model_embeddings:
+                chunk_contents.append(chunk['content'])
+
+    processed_writer.close()
+    texts_writer.close()
+    chunk_writer.close()
+
+    bm25_index = bm25_builder.build(k1=settings.bm25_k1, b=settings.bm25_b)
+    index_version = bm25_index.save(keyword_retriever_path)
+
+    if model_embeddings:
+        from app.services.embedding_engine import EmbeddingEngine
+        EmbeddingEngine().embed_to_file(chunk_contents, embed_path)
+    else:
+        embeddings = np.lib.format.open_memmap(
+            embed_path, mode='w+', dtype=np.float16, shape=(len(chunk_titles), settings.embedding_dimension)
+        )
+        centres = _title_centres(seed)
+        title_codes = np.asarray(chunk_titles, dtype=np.int64)
+        for start in range(0, len(title_codes), 65536):
+            embeddings[start:start + 65536] = _synthetic_embeddings(centres, title_codes[start:start + 65536], seed + start)
+        embeddings.flush()
+        del embeddings
+
+    summary = {
+        'jobs': n_jobs,
+        'chunks': len(chunk_titles),
+        'index_version': index_version,
+        'model_embeddings': model_embeddings,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info(f'Synthetic corpus written: {summary}')
+    return summary
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import time
+import numpy as np
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+from qdrant_client import QdrantClient
+from app.services import LLM_integration
+from app.utils import vector_store
+from app.utils.vector_store import chunks_path, embeddings_path, upsert_chunks
+from app.config import logger
+
+
+def install_in_memory_qdrant() -> QdrantClient:
+    """
+    Replace the shared Qdrant client with an in-memory one holding the corpus.
+
+    Uses qdrant-client's local mode, so qdrant_semantic_search runs its real
+    code path without a server. Local mode searches by brute force, so keep
+    corpora small or benchmark VECTOR_BACKEND=local instead.
+
+    Returns:
+        The in-memory client
+    """
+    started = time.perf_counter()
+    client = QdrantClient(location=':memory:')
+    vector_store.recreate_collection(client)
+
+    with open(chunks_path, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    upsert_chunks(client, chunks, embeddings, batch_size=1024)
+
+    vector_store._qdrant_client = client
+    logger.info(f'In-memory Qdrant loaded with {len(chunks)} points in {time.perf_counter() - started:.1f}s')
+    return client
+
+
+def fake_answer(results) -> str:
+    """An answer in the format of the prompt, listing the first three jobs."""
+    lines = []
+    for rank, job in enumerate(results[:3], 1):
+        lines.append(f"{rank}. **{job['ID']} - {job['Job Title']}**")
+        lines.append('- This job was chosen because its title matches the query.')
+    return '\n'.join(lines) or 'Such type of job does not exist in the database.'
+
+
+def install_fake_llm(latency_ms: float = 800.0) -> None:
+    """
+    Replace the Groq chain with a fake LLM that answers after `latency_ms`.
+
+    The prompt is still rendered, so only the network call is simulated.
+    """
+    latency = latency_ms / 1000
+
+    def invoke(inputs):
+        LLM_integration.prompt.invoke(inputs)
+        time.sleep(latency)
+        return fake_answer(inputs['results'])
+
+    async def ainvoke(inputs):
+        LLM_integration.prompt.invoke(inputs)
+        await asyncio.sleep(latency)
+        return fake_answer(inputs['results'])
+
+    LLM_integration._chain = RunnableLambda(invoke, afunc=ainvoke) | StrOutputParser()
+    logger.info(f'Fake LLM installed with {latency_ms:.0f}ms latency')
@@ -25,24 +25,61 @@ class Settings(BaseSettings):
     vector_db_api_key: Optional[str] = Field(default=None, alias="VECTOR_DB_API_KEY")
     vector_db_collection_name: str = Field(default="job_documents", alias="VECTOR_DB_COLLECTION_NAME")
     vector_size: int = Field(default=384, alias="VECTOR_SIZE")
+    vector_db_prefer_grpc: bool = Field(default=False, alias="VECTOR_DB_PREFER_GRPC")
+    vector_db_grpc_port: int = Field(default=6334, alias="VECTOR_DB_GRPC_PORT")
+    vector_db_pool_size: int = Field(default=20, alias="VECTOR_DB_POOL_SIZE")
+    vector_db_keepalive_seconds: float = Field(default=30.0, alias="VECTOR_DB_KEEPALIVE_SECONDS")
+    vector_db_timeout: int = Field(default=60, alias="VECTOR_DB_TIMEOUT")
+    vector_db_search_timeout: int = Field(default=5, alias="VECTOR_DB_SEARCH_TIMEOUT")
+    vector_db_startup_check: bool = Field(default=True, alias="VECTOR_DB_STARTUP_CHECK")
+    vector_db_indexing_threshold: int = Field(default=20000, alias="VECTOR_DB_INDEXING_THRESHOLD")
+    vector_upload_batch_size: int = Field(default=256, alias="VECTOR_UPLOAD_BATCH_SIZE")
+    vector_upload_parallel: int = Field(default=4, alias="VECTOR_UPLOAD_PARALLEL")
+    vector_upload_max_retries: int = Field(default=5, alias="VECTOR_UPLOAD_MAX_RETRIES")
+    
+    # Vector search backend: "qdrant", "local" (exact search over embeddings.npy)
+    # or "binary" (sign-bit codes with float rescoring)
+    vector_backend: str = Field(default="qdrant", alias="VECTOR_BACKEND")
+    local_vector_block_size: int = Field(default=65536, alias="LOCAL_VECTOR_BLOCK_SIZE")
+    binary_rescore_candidates: int = Field(default=1000, alias="BINARY_RESCORE_CANDIDATES")
     
     # LLM Configuration
     llm_model: str = Field(default="llama-3.1-8b-instant", alias="LLM_MODEL")
     llm_temperature: float = Field(default=0.3, alias="LLM_TEMPERATURE")
     llm_max_tokens: int = Field(default=1000, alias="LLM_MAX_TOKENS")
     llm_api_key: Optional[str] = Field(default=None, alias="LLM_API_KEY")
+    llm_batch_concurrency: int = Field(default=4, alias="LLM_BATCH_CONCURRENCY")
     
     # Embedding Configuration
     embedding_model: str = Field(default="all-MiniLM-L6-v2", alias="EMBEDDING_MODEL")
     embedding_dimension: int = Field(default=384, alias="EMBEDDING_DIMENSION")
     embedding_batch_size: int = Field(default=100, alias="EMBEDDING_BATCH_SIZE")
+    embedding_cache_size: int = Field(default=10000, alias="EMBEDDING_CACHE_SIZE")
+    embedding_cache_ttl: Optional[float] = Field(default=None, alias="EMBEDDING_CACHE_TTL")
+    embedding_workers: Optional[int] = Field(default=None, alias="EMBEDDING_WORKERS")
+    embedding_worker_threads: int = Field(default=2, alias="EMBEDDING_WORKER_THREADS")
+    embedding_unit_size: int = Field(default=2048, alias="EMBEDDING_UNIT_SIZE")
+    
+    # Model inference backend for the embedder and cross-encoder: "torch", "onnx" or "onnx-int8"
+    inference_backend: str = Field(default="torch", alias="INFERENCE_BACKEND")
+    inference_threads: Optional[int] = Field(default=None, alias="INFERENCE_THREADS")
+    onnx_quantization_config: str = Field(default="avx512_vnni", alias="ONNX_QUANTIZATION_CONFIG")
     
     # Search Configuration
     default_top_k: int = Field(default=20, alias="DEFAULT_TOP_K")
+    max_batch_queries: int = Field(default=1000, alias="MAX_BATCH_QUERIES")
+    
+    # Latency budget of /api/query, None waits for every stage
+    latency_budget_ms: Optional[float] = Field(default=None, alias="LATENCY_BUDGET_MS")
+    rerank_min_budget_ms: float = Field(default=150, alias="RERANK_MIN_BUDGET_MS")
+    llm_min_budget_ms: float = Field(default=1000, alias="LLM_MIN_BUDGET_MS")
     
     # Reranking
     reranker_model: str = Field(default="cross-encoder/ms-marco-MiniLM-L-6-v2", alias="RERANKER_MODEL")
     reranker_top_k: int = Field(default=5, alias="RERANKER_TOP_K")
+    rerank_mode: str = Field(default="full", alias="RERANK_MODE")  # full or cascade
+    cascade_margin: float = Field(default=0.05, alias="CASCADE_MARGIN")
+    cascade_min_candidates: int = Field(default=8, alias="CASCADE_MIN_CANDIDATES")
     
     # Keyword Search
     bm25_k1: float = Field(default=1.2, alias="BM25_K1")
@@ -50,6 +87,47 @@ class Settings(BaseSettings):
     
     # Hybrid Search
     k: float = Field(default=60, alias="K")
+    hybrid_candidates: int = Field(default=15, alias="HYBRID_CANDIDATES")
+    bm25_weight: float = Field(default=1.0, alias="BM25_WEIGHT")
+    semantic_weight: float = Field(default=1.0, alias="SEMANTIC_WEIGHT")
+    
+    # Result Cache
+    result_cache_enabled: bool = Field(default=True, alias="RESULT_CACHE_ENABLED")
+    result_cache_backend: str = Field(default="memory", alias="RESULT_CACHE_BACKEND")
+    result_cache_redis_url: str = Field(default="redis://localhost:6379/0", alias="RESULT_CACHE_REDIS_URL")
+    result_cache_size: int = Field(default=1000, alias="RESULT_CACHE_SIZE")
+    llm_cache_size: int = Field(default=5000, alias="LLM_CACHE_SIZE")
+    result_cache_ttl: Optional[float] = Field(default=86400, alias="RESULT_CACHE_TTL")
+    
+    # Token for the /api/admin endpoints, which are disabled without one
+    admin_token: Optional[str] = Field(default=None, alias="ADMIN_TOKEN")
+    
+    # Startup
+    warmup_on_startup: bool = Field(default=True, alias="WARMUP_ON_STARTUP")
+    warmup_workers: int = Field(default=8, alias="WARMUP_WORKERS")
+    warmup_retry_initial_seconds: float = Field(default=1.0, alias="WARMUP_RETRY_INITIAL_SECONDS")
+    warmup_retry_max_seconds: float = Field(default=30.0, alias="WARMUP_RETRY_MAX_SECONDS")
+    
+    # Metrics
+    timing_headers: bool = Field(default=False, alias="TIMING_HEADERS")
+    metrics_pushgateway_url: Optional[str] = Field(default=None, alias="METRICS_PUSHGATEWAY_URL")
+    
+    # Concurrency
+    inference_executor_workers: int = Field(default=2, alias="INFERENCE_EXECUTOR_WORKERS")
+    search_executor_workers: int = Field(default=4, alias="SEARCH_EXECUTOR_WORKERS")
+    
+    # Micro-batching of concurrent model calls
+    micro_batch_enabled: bool = Field(default=True, alias="MICRO_BATCH_ENABLED")
+    micro_batch_max_wait_ms: float = Field(default=5.0, alias="MICRO_BATCH_MAX_WAIT_MS")
+    embedding_micro_batch_size: int = Field(default=64, alias="EMBEDDING_MICRO_BATCH_SIZE")
+    reranker_micro_batch_size: int = Field(default=256, alias="RERANKER_MICRO_BATCH_SIZE")
+    reranker_batch_size: int = Field(default=64, alias="RERANKER_BATCH_SIZE")
+    
+    # Ingestion
+    preprocess_workers: Optional[int] = Field(default=None, alias="PREPROCESS_WORKERS")
+    preprocess_shard_size: int = Field(default=500, alias="PREPROCESS_SHARD_SIZE")
+    ingestion_mode: str = Field(default="batch", alias="INGESTION_MODE")  # batch or stream
+    stream_batch_size: int = Field(default=1000, alias="STREAM_BATCH_SIZE")
     
     # Data Directories
     data_dir: str = Field(default="./data", alias="DATA_DIR")
@@ -62,9 +140,12 @@ class Settings(BaseSettings):
     # File name
     file_name: str = Field(default='LF Jobs.xlsx', alias='FILE_NAME')
     processed_file_name: str = Field(default='processed.json', alias='PROCESSED_FILE_NAME')
+    job_texts_file_name: str = Field(default='job_texts.json', alias='JOB_TEXTS_FILE_NAME')
     chunked_file_name: str = Field(default='chunked.json', alias='CHUNKED_FILE_NAME')
     embeddings_file_name: str = Field(default='embeddings.npy', alias='EMBEDDINGS_FILE_NAME')
-    keyword_retriever_file: str = Field(default='keyword_retriever.pkl', alias='KEYWORD_RETRIVER_FILE')
+    binary_embeddings_file_name: str = Field(default='embeddings_binary.npy', alias='BINARY_EMBEDDINGS_FILE_NAME')
+    manifest_file_name: str = Field(default='manifest.json', alias='MANIFEST_FILE_NAME')
+    keyword_retriever_file: str = Field(default='keyword_index', alias='KEYWORD_RETRIVER_FILE')
     
     
     class Config:
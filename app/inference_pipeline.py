@@ -1,19 +1,22 @@
-from app.services.hybrid_search import perform_hybrid_search
-from app.services.reranker import rerank_jobs
-from app.services.LLM_integration import llm_result
+import asyncio
+import pandas as pd
+from app.services.hybrid_search import perform_hybrid_search, perform_hybrid_search_async, perform_hybrid_search_batch, fuse_results
+from app.services.keyword_retriever import search_bm25
+from app.services.vector_retriever import semantic_search_async
+from app.services.reranker import rerank_jobs, rerank_jobs_async, rerank_jobs_batch
+from app.services.LLM_integration import llm_result, llm_result_async, llm_result_stream, llm_result_batch
+from app.services.result_cache import result_cache
+from app.utils.executors import search_executor, run_in_executor
+from app.utils.metrics import track_stage, observe_skipped
+from app.utils.deadline import Deadline
+from app.utils.job_store import get_job_store
+from app.config import settings
+from typing import Any, Dict, List, Optional
 from app.config import logger
 
 
-def run_pipeline(query: str):
-    # 1. Search for relevant documents
-    logger.info('searching')
-    ids, contents = perform_hybrid_search(query=query)
-
-    # 2. Rerank the search results and retrieve top k results
-    logger.info('reranking')
-    reranked_result = rerank_jobs(job_ids=ids, query=query)
-
-    # 3. convert the results from hybrid search and reranking for entry to llm
+def prepare_llm_input(reranked_result, contents):
+    """Strip bulky fields from the reranked jobs and attach their matched chunks."""
     keys_to_remove = {"cleaned_title", "Job Description", "Publication Date"}
 
     for item in reranked_result:
@@ -24,8 +27,314 @@ def run_pipeline(query: str):
         combined = contents[item["ID"]]
         item["combined_chunks"] = [chunk[:300] for chunk in combined]
 
-    # 3. Call LLM to enrich the results
-    logger.info('enriching')
-    llm_output = llm_result(reranked_result, query)
+    return reranked_result
+
+
+def run_pipeline(query: str):
+    with track_stage('pipeline'):
+        return _run_pipeline(query)
+
+
+def _run_pipeline(query: str):
+    # 0. Return the cached answer for an identical query
+    if settings.result_cache_enabled:
+        cached = result_cache.get_answer(query)
+        if cached is not None:
+            logger.info('answer cache hit')
+            return cached
+
+    # 1. Search for relevant documents
+    logger.info('searching')
+    with track_stage('search'):
+        ids, contents = perform_hybrid_search(query=query)
+
+    # 2. Rerank the search results and retrieve top k results
+    logger.info('reranking')
+    with track_stage('rerank'):
+        reranked_result = rerank_jobs(job_ids=ids, query=query)
+
+    # 3. convert the results from hybrid search and reranking for entry to llm
+    reranked_result = prepare_llm_input(reranked_result, contents)
+
+    # 4. Call LLM to enrich the results, unless these jobs were already explained for this query
+    job_ids = [item["ID"] for item in reranked_result]
+    llm_output = result_cache.get_llm_answer(query, job_ids) if settings.result_cache_enabled else None
+    if llm_output is None:
+        logger.info('enriching')
+        with track_stage('llm'):
+            llm_output = llm_result(reranked_result, query)
+
+    if settings.result_cache_enabled:
+        result_cache.set_llm_answer(query, job_ids, llm_output)
+        result_cache.set_answer(query, llm_output)
+
+    return llm_output
+
+
+def run_pipeline_batch(queries: List[str]) -> List[str]:
+    """
+    Run the pipeline for many queries, batching every stage.
+
+    Keyword scoring, query embedding, vector search and cross-encoder scoring
+    each run once for the whole batch, and the LLM calls run with bounded
+    concurrency. Answers are returned in the order of `queries`.
+    """
+    answers: List[Optional[str]] = [None] * len(queries)
+
+    # 0. Serve cached answers and only run the rest
+    if settings.result_cache_enabled:
+        answers = [result_cache.get_answer(query) for query in queries]
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    if not pending:
+        return answers
+    pending_queries = [queries[i] for i in pending]
+
+    # 1. Search for relevant documents
+    logger.info(f'searching {len(pending_queries)} queries')
+    with track_stage('search_batch'):
+        search_results = perform_hybrid_search_batch(pending_queries)
+
+    # 2. Rerank every query's candidates in one cross-encoder call
+    logger.info('reranking')
+    with track_stage('rerank_batch'):
+        reranked_results = rerank_jobs_batch([ids for ids, _ in search_results], pending_queries)
+
+    # 3. convert the results from hybrid search and reranking for entry to llm
+    reranked_results = [
+        prepare_llm_input(reranked_result, contents)
+        for reranked_result, (_, contents) in zip(reranked_results, search_results)
+    ]
+
+    # 4. Call LLM for every query without a cached explanation
+    job_ids_list = [[item["ID"] for item in reranked_result] for reranked_result in reranked_results]
+    llm_outputs: List[Optional[str]] = [None] * len(pending_queries)
+    if settings.result_cache_enabled:
+        llm_outputs = [result_cache.get_llm_answer(q, ids) for q, ids in zip(pending_queries, job_ids_list)]
+
+    to_enrich = [i for i, output in enumerate(llm_outputs) if output is None]
+    if to_enrich:
+        logger.info(f'enriching {len(to_enrich)} queries')
+        with track_stage('llm_batch'):
+            responses = llm_result_batch(
+                [reranked_results[i] for i in to_enrich],
+                [pending_queries[i] for i in to_enrich],
+            )
+        for i, response in zip(to_enrich, responses):
+            llm_outputs[i] = response
+
+    for i, query, job_ids, llm_output in zip(pending, pending_queries, job_ids_list, llm_outputs):
+        if settings.result_cache_enabled:
+            result_cache.set_llm_answer(query, job_ids, llm_output)
+            result_cache.set_answer(query, llm_output)
+        answers[i] = llm_output
+
+    return answers
+
+
+async def run_pipeline_async(query: str):
+    with track_stage('pipeline'):
+        return await _run_pipeline_async(query)
+
+
+async def _run_pipeline_async(query: str):
+    # 0. Return the cached answer for an identical query
+    if settings.result_cache_enabled:
+        cached = result_cache.get_answer(query)
+        if cached is not None:
+            logger.info('answer cache hit')
+            return cached
+
+    # 1-3. Search, rerank and prepare the jobs for the LLM
+    reranked_result = await retrieve_jobs_async(query)
+
+    # 4. Await the LLM without holding a worker thread, unless these jobs were already explained
+    job_ids = [item["ID"] for item in reranked_result]
+    llm_output = result_cache.get_llm_answer(query, job_ids) if settings.result_cache_enabled else None
+    if llm_output is None:
+        logger.info('enriching')
+        with track_stage('llm'):
+            llm_output = await llm_result_async(reranked_result, query)
+
+    if settings.result_cache_enabled:
+        result_cache.set_llm_answer(query, job_ids, llm_output)
+        result_cache.set_answer(query, llm_output)
 
     return llm_output
+
+
+
+def _abandon(task: asyncio.Future) -> None:
+    """
+    Stop waiting for a task without cancelling it.
+
+    Cancelling would reach the micro-batcher futures the task awaits, so it
+    is left to finish in the background and its outcome is discarded.
+    """
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+async def run_pipeline_with_deadline(query: str, budget_ms: float) -> Dict[str, Any]:
+    """
+    Run the pipeline within a latency budget, dropping stages that no longer fit.
+
+    Stages degrade in steps as the budget runs out or a dependency stalls:
+    the LLM is skipped and the reranked jobs are returned, then the
+    cross-encoder is skipped and the fused ranking is returned, and if
+    semantic search misses its deadline the ranking is BM25 only. The answer
+    cache holds no jobs, so only the LLM level of the result cache is used.
+
+    Args:
+        query: The query string
+        budget_ms: Milliseconds until the response is due
+
+    Returns:
+        Dictionary with the answer (None without the LLM), the jobs, the
+        stages that ran and those that were skipped
+    """
+    with track_stage('pipeline'):
+        deadline = Deadline(budget_ms)
+        stages, skipped = [], []
+
+        def skip(stage: str) -> None:
+            skipped.append(stage)
+            observe_skipped(stage)
+
+        def response(answer: Optional[str], jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+            return {
+                'answer': answer,
+                'jobs': jobs,
+                'stages': stages,
+                'skipped': skipped,
+                'degraded': bool(skipped),
+                'elapsed_ms': round(deadline.elapsed_ms(), 1),
+            }
+
+        # 1. Keyword and semantic search run concurrently, semantic search has to leave time to rerank
+        bm25_task = asyncio.ensure_future(run_in_executor(search_executor, search_bm25, query))
+        semantic_task = asyncio.ensure_future(semantic_search_async(query))
+        await asyncio.wait({bm25_task, semantic_task}, timeout=deadline.remaining(settings.rerank_min_budget_ms))
+        if not bm25_task.done():
+            await asyncio.wait({bm25_task}, timeout=deadline.remaining())
+
+        if not bm25_task.done():
+            _abandon(bm25_task)
+            _abandon(semantic_task)
+            skip('bm25')
+            skip('semantic')
+            logger.warning(f'Keyword search missed the {budget_ms:.0f}ms budget')
+            return response(None, [])
+        if bm25_task.exception() is not None:
+            _abandon(semantic_task)
+            skip('bm25')
+            skip('semantic')
+            logger.warning(f'Keyword search failed: {bm25_task.exception()}')
+            return response(None, [])
+        bm25_result = bm25_task.result()
+        stages.append('bm25')
+
+        semantic_result = None
+        if not semantic_task.done():
+            _abandon(semantic_task)
+            logger.warning('Semantic search missed its deadline, ranking by BM25 only')
+        elif semantic_task.exception() is not None:
+            logger.warning(f'Semantic search failed, ranking by BM25 only: {semantic_task.exception()}')
+        else:
+            semantic_result = semantic_task.result()
+
+        if semantic_result is None:
+            skip('semantic')
+            semantic_result = pd.DataFrame(columns=['job_id', 'rank', 'content'])
+        else:
+            stages.append('semantic')
+        ids, contents = fuse_results(bm25_result, semantic_result)
+        stages.append('fusion')
+
+        # 2. Rerank if the cross-encoder still fits, otherwise keep the fused ranking
+        reranked_result = None
+        if deadline.allows(settings.rerank_min_budget_ms):
+            try:
+                with track_stage('rerank'):
+                    reranked_result = await asyncio.wait_for(
+                        rerank_jobs_async(job_ids=ids, query=query),
+                        timeout=deadline.remaining(),
+                    )
+                stages.append('rerank')
+            except asyncio.TimeoutError:
+                logger.warning('Reranking missed its deadline, returning the fused ranking')
+            except Exception as e:
+                logger.warning(f'Reranking failed, returning the fused ranking: {e}')
+        if reranked_result is None:
+            skip('rerank')
+            reranked_result = get_job_store().get_jobs(ids[:settings.reranker_top_k])
+        jobs = prepare_llm_input(reranked_result, contents)
+
+        # 3. Explain the jobs if the LLM still fits, unless they were already explained
+        job_ids = [item["ID"] for item in jobs]
+        llm_output = result_cache.get_llm_answer(query, job_ids) if settings.result_cache_enabled else None
+        if llm_output is not None:
+            stages.append('llm_cache')
+        elif deadline.allows(settings.llm_min_budget_ms):
+            try:
+                with track_stage('llm'):
+                    llm_output = await asyncio.wait_for(llm_result_async(jobs, query), timeout=deadline.remaining())
+                stages.append('llm')
+            except asyncio.TimeoutError:
+                logger.warning('LLM missed its deadline, returning the jobs without explanation')
+            except Exception as e:
+                logger.warning(f'LLM failed, returning the jobs without explanation: {e}')
+        if llm_output is None:
+            skip('llm')
+
+        # Only complete answers are cached
+        if settings.result_cache_enabled and llm_output is not None and not skipped:
+            result_cache.set_llm_answer(query, job_ids, llm_output)
+            result_cache.set_answer(query, llm_output)
+
+        return response(llm_output, jobs)
+
+
+async def retrieve_jobs_async(query: str):
+    """Hybrid search and reranking, returning the top jobs prepared for the LLM."""
+    # 1. Search for relevant documents, keyword and semantic search run concurrently
+    logger.info('searching')
+    with track_stage('search'):
+        ids, contents = await perform_hybrid_search_async(query=query)
+
+    # 2. Rerank without blocking the event loop
+    logger.info('reranking')
+    with track_stage('rerank'):
+        reranked_result = await rerank_jobs_async(job_ids=ids, query=query)
+
+    # 3. convert the results from hybrid search and reranking for entry to llm
+    return prepare_llm_input(reranked_result, contents)
+
+
+async def stream_pipeline(query: str):
+    """
+    Run the pipeline and yield (event, data) pairs as results become available.
+
+    The reranked jobs are yielded first as a 'jobs' event, followed by the LLM
+    explanation as 'token' events and a final 'done' event.
+    """
+    reranked_result = await retrieve_jobs_async(query)
+    yield 'jobs', reranked_result
+
+    # Replay a cached explanation as a single token
+    job_ids = [item["ID"] for item in reranked_result]
+    llm_output = result_cache.get_llm_answer(query, job_ids) if settings.result_cache_enabled else None
+    if llm_output is not None:
+        yield 'token', llm_output
+    else:
+        logger.info('enriching')
+        tokens = []
+        with track_stage('llm'):
+            async for token in llm_result_stream(reranked_result, query):
+                tokens.append(token)
+                yield 'token', token
+        llm_output = ''.join(tokens)
+
+    if settings.result_cache_enabled:
+        result_cache.set_llm_answer(query, job_ids, llm_output)
+        result_cache.set_answer(query, llm_output)
+
+    yield 'done', None
@@ -1,32 +1,10 @@
-from app.services.preprocessing import preprocess_dataset
-from app.utils.chunker import chunk_job_descriptions
-from app.services.embeddings import embed_chunks
-from app.utils.bm25 import create_bm25_retriever
-from app.utils.vector_store import get_qdrant_client, populate_vectordb
+from app.services.incremental_ingestion import run_ingestion
+from app.utils.metrics import push_ingestion_metrics
 from app.config import logger
 
-# 1. Preprocess the dataset and store it as json
-if not processed_data_path.exists():
-    logger.info('\nProcessing the data...')
-    preprocess_dataset()
-
-# 2. Chunk the data 
-if not chunked_data_path.exists():
-    logger.info('\nCreating chunks...')
-    chunk_job_descriptions()
-
-# 3. Generate embeddings
-if not embeddings_data_path.exists():
-    logger.info('Genrating embeddings')
-    embed_chunks()
-
-# 4. Populate keyword retriever
-if not keyword_retriever_path.exists():
-    logger.info('Initailizing keyword retriever')
-    create_bm25_retriever()
-
-# 5. Populate vector database
-client = get_qdrant_client()
-if not client.collection_exists(collection_name=settings.vector_db_collection_name):
-    logger.info('\nPopulating vector database...')
-    populate_vectordb(client)
\ No newline at end of file
+# Guarded, as the embedding workers are spawned processes that import this module
+if __name__ == '__main__':
+    # Build every index on the first run, afterwards only apply new, changed and removed jobs
+    manifest = run_ingestion()
+    logger.info(f"Ingestion finished at index version {manifest['index_version']}")
+    push_ingestion_metrics()
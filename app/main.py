@@ -1,6 +1,19 @@
-from fastapi import FastAPI
-from app.models import QueryRequest
-from app.inference_pipeline import run_pipeline
+import json
+import secrets
+import threading
+import time
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Optional, Union
+from app.models import QueryRequest, QueryResponse, BatchQueryRequest
+from app.inference_pipeline import run_pipeline_async, run_pipeline_batch, run_pipeline_with_deadline, stream_pipeline
+from app.services.keyword_retriever import get_keyword_index
+from app.utils.index_snapshot import reload_index_snapshot
+from app.utils.vector_store import close_qdrant_clients
+from app.utils.executors import shutdown_executors
+from app.utils.resources import registry
+from app.utils.metrics import REQUESTS_IN_FLIGHT, request_timings, render_metrics, server_timing_header
+from app.config import settings
 from app.config import logger
 
 router = FastAPI(
@@ -9,11 +22,121 @@ router = FastAPI(
 )
 
 
-@router.post("/api/query", response_model=str)
-def query_jobs(request: QueryRequest):
+@router.middleware("http")
+async def track_requests(request: Request, call_next):
+
+    # Count in-flight requests per endpoint and, when enabled, report the stage timings
+    # of the request in a Server-Timing header
+    # Unknown paths share a label, so scanners can't grow the number of series
+    path = request.url.path
+    endpoint = path if any(getattr(route, 'path', None) == path for route in router.routes) else 'other'
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    token = request_timings.set({}) if settings.timing_headers else None
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        in_flight.dec()
+
+    if token is not None:
+        timings = request_timings.get()
+        request_timings.reset(token)
+        timings['total'] = time.perf_counter() - started
+        response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+
+@router.on_event("startup")
+def warm_up_resources():
+
+    # Models, indexes and clients load in the background while the server already accepts
+    # connections, /ready reports when they are all loaded and warmed up
+    if settings.warmup_on_startup:
+        logger.info('Warming up models and indexes')
+        # Failed resources are retried with backoff, so the worker becomes ready once they recover
+        threading.Thread(target=registry.warm_up, kwargs={'retry': True}, name='warmup', daemon=True).start()
+
+
+@router.get("/ready")
+def ready():
+
+    # Without a startup warm-up, resources load on first use and the worker is always ready
+    status = registry.status() if settings.warmup_on_startup else {'ready': True, 'resources': {}}
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
+@router.get("/metrics")
+def metrics():
+
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@router.on_event("shutdown")
+async def close_connections():
+
+    await close_qdrant_clients()
+    shutdown_executors()
+
+
+@router.post("/api/query", response_model=Union[str, QueryResponse])
+async def query_jobs(request: QueryRequest):
+
+    # With a latency budget, stages that don't fit are skipped and the response reports which ran
+    budget_ms = request.latency_budget_ms or settings.latency_budget_ms
+    if budget_ms:
+        logger.info(f'Sending request to pipeline with a {budget_ms:.0f}ms budget')
+        return await run_pipeline_with_deadline(request.query, budget_ms)
     
     logger.info('Sending request to pipeline')
-    results = run_pipeline(request.query)
+    results = await run_pipeline_async(request.query)
 
     logger.info('Results found Returning them')
-    return results
\ No newline at end of file
+    return results
+
+
+@router.post("/api/query/batch", response_model=List[str])
+def query_jobs_batch(request: BatchQueryRequest):
+
+    logger.info(f'Sending batch of {len(request.queries)} queries to pipeline')
+    results = run_pipeline_batch(request.queries)
+
+    logger.info('Batch results found Returning them')
+    return results
+
+
+@router.post("/api/query/stream")
+async def stream_query_jobs(request: QueryRequest):
+
+    logger.info('Streaming request through pipeline')
+
+    async def event_stream():
+        async for event, data in stream_pipeline(request.query):
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+
+    # Admin endpoints are off unless ADMIN_TOKEN is set, and then need it in the X-Admin-Token header
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/api/admin/reload-keyword-index", dependencies=[Depends(require_admin_token)])
+def reload_keyword_retriever():
+
+    logger.info('Reloading keyword index')
+    # BM25 and embedding rows refer to chunk store rows, so every index is loaded
+    # first and then published together as one snapshot
+    snapshot = reload_index_snapshot()
+
+    return {"index_version": get_keyword_index(snapshot).index_version}
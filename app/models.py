@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from app.config import settings
 
 
@@ -13,6 +13,13 @@ class QueryRequest(BaseModel):
         description="Search query for job listings",
         example="senior data scientist machine learning"
     )
+    latency_budget_ms: Optional[float] = Field(
+        None,
+        gt=0,
+        le=60000,
+        description="Milliseconds to answer in, stages that don't fit are skipped. Overrides LATENCY_BUDGET_MS",
+        example=2000
+    )
 
     @validator('query')
     def validate_query(cls, v):
@@ -20,4 +27,40 @@ class QueryRequest(BaseModel):
         if not v.strip():
             raise ValueError('Query cannot be empty or just whitespace')
         return v.strip()
-   
\ No newline at end of file
+   
+
+
+class QueryResponse(BaseModel):
+    """Response of a query answered within a latency budget."""
+
+    answer: Optional[str] = Field(None, description="LLM explanation of the jobs, None if the LLM was skipped")
+    jobs: List[Dict[str, Any]] = Field(..., description="Reranked jobs, or the fused ranking if reranking was skipped")
+    stages: List[str] = Field(..., description="Pipeline stages that ran")
+    skipped: List[str] = Field(..., description="Pipeline stages skipped to meet the budget")
+    degraded: bool = Field(..., description="Whether any stage was skipped")
+    elapsed_ms: float
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for running many job search queries at once."""
+
+    queries: List[str] = Field(
+        ...,
+        min_items=1,
+        description="Search queries for job listings",
+        example=["senior data scientist machine learning", "remote python developer"]
+    )
+
+    @validator('queries')
+    def validate_queries(cls, v):
+        """Apply the single query rules to every query and cap the batch size"""
+        if len(v) > settings.max_batch_queries:
+            raise ValueError(f'At most {settings.max_batch_queries} queries are allowed per batch')
+        cleaned = []
+        for query in v:
+            if not query.strip():
+                raise ValueError('Query cannot be empty or just whitespace')
+            if len(query) > 200:
+                raise ValueError('Query cannot be longer than 200 characters')
+            cleaned.append(query.strip())
+        return cleaned
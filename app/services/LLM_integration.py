@@ -1,22 +1,18 @@
-from langchain_groq import ChatGroq
+import threading
 from langchain_core.prompts import ChatPromptTemplate
 from app.config import settings
 from langchain_core.output_parsers import StrOutputParser
+from app.utils.resources import register_resource
+from app.utils.metrics import track_external_call
 
-llm = ChatGroq(
-    model=settings.llm_model,
-    temperature=settings.llm_temperature,
-    max_tokens=settings.llm_max_tokens,
-    groq_api_key=settings.llm_api_key
-    )
+# Bump whenever the prompt text changes so cached LLM answers are not reused
+PROMPT_VERSION = 1
 
-
-def llm_result(results, query):
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                '''You are a highly skilled job search assistant. Your task is to get the most relevant job listings for the user based on their query and provided job data.
+prompt = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            '''You are a highly skilled job search assistant. Your task is to get the most relevant job listings for the user based on their query and provided job data.
     Use **only** the job data provided. Do not hypothesize anything.
     If the query is not related to a job data search, say that it's not your expertise.
     If no job is returned or no returned job matches the user's query,just apologize and say that such type of job doesn't exist in the database. No need to mention anything else.
@@ -64,12 +60,61 @@ def llm_result(results, query):
     - The job is not present in the database if it's a job related query.
     - I am unable to handle tasks other than matching jobs if it's not a job related query.
     '''
-            )
-        ]
-    )
-    
-    chain = prompt | llm  | StrOutputParser()
+        )
+    ]
+)
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_chain():
+    """Return the prompt | LLM | parser chain, creating the Groq client on first use."""
+    global _chain
+
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                from langchain_groq import ChatGroq
+
+                llm = ChatGroq(
+                    model=settings.llm_model,
+                    temperature=settings.llm_temperature,
+                    max_tokens=settings.llm_max_tokens,
+                    groq_api_key=settings.llm_api_key
+                    )
+                _chain = prompt | llm | StrOutputParser()
+    return _chain
+
+
+# No dummy completion, warming up only creates the client
+register_resource('llm', get_chain)
+
+
+def llm_result(results, query):
+    with track_external_call('llm', 'invoke'):
+        response = get_chain().invoke({'query': query, 'results': results})
+
+    return response
+
+
+async def llm_result_async(results, query):
+    with track_external_call('llm', 'invoke'):
+        response = await get_chain().ainvoke({'query': query, 'results': results})
+
+    return response
+
+
+
+def llm_result_batch(results_list, queries):
+    inputs = [{'query': query, 'results': results} for results, query in zip(results_list, queries)]
+    with track_external_call('llm', 'batch'):
+        responses = get_chain().batch(inputs, config={'max_concurrency': settings.llm_batch_concurrency})
+
+    return responses
 
-    response = chain.invoke({'query': query, 'results': results})
 
-    return response
\ No newline at end of file
+async def llm_result_stream(results, query):
+    with track_external_call('llm', 'stream'):
+        async for token in get_chain().astream({'query': query, 'results': results}):
+            yield token
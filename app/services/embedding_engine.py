@@ -0,0 +1,163 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, List, Optional
+import numpy as np
+from app.config import settings
+from app.config import logger
+
+# Model of an encode worker process, loaded once by the pool initializer
+_worker_model = None
+
+
+def _init_worker(threads: int) -> None:
+    """Load the embedding model on CPU in a pool process."""
+    global _worker_model
+    from app.utils.model_backend import load_embedder
+
+    _worker_model = load_embedder('cpu', threads=threads)
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    """Encode one unit of length-sorted texts in a pool process."""
+    return _worker_model.encode(
+        texts,
+        batch_size=settings.embedding_batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).astype(np.float16)
+
+
+def length_sorted_units(texts: List[str], unit_size: int) -> List[np.ndarray]:
+    """
+    Split row indices into units of similar text length.
+
+    Rows are sorted by length, so every batch the model pads holds texts of
+    nearly the same length instead of short and long sections mixed.
+
+    Returns:
+        Row indices of each unit, shortest texts first
+    """
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(lengths, kind='stable')
+    return [order[start:start + unit_size] for start in range(0, len(order), unit_size)]
+
+
+class EmbeddingEngine:
+    """
+    Embeds a list of texts into an .npy file, in length buckets and with resume.
+
+    The texts are split into units of `unit_size` rows of similar length.
+    On CPU the units are encoded by a pool of processes, each running the
+    model with `threads` intra-op threads. Finished units are written to
+    their original rows of a memmapped output and recorded in a checkpoint
+    file, so an interrupted run only encodes the missing units.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        threads: Optional[int] = None,
+        unit_size: Optional[int] = None,
+    ):
+        self.threads = threads or settings.embedding_worker_threads
+        self.workers = workers or settings.embedding_workers or max(1, (os.cpu_count() or 1) // self.threads)
+        self.unit_size = unit_size or settings.embedding_unit_size
+
+    def _fingerprint(self, texts: List[str]) -> str:
+        """Identify the input and unit layout, so checkpoints of another input are not reused."""
+        digest = hashlib.sha256()
+        digest.update(f'{settings.embedding_model}:{self.unit_size}:{len(texts)}'.encode('utf-8'))
+        for text in texts:
+            digest.update(hashlib.sha1(text.encode('utf-8')).digest())
+        return digest.hexdigest()[:16]
+
+    def embed_to_file(
+        self,
+        texts: List[str],
+        output_path: Path,
+        encode_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+    ) -> None:
+        """
+        Embed `texts` into `output_path`, row i holding the embedding of texts[i].
+
+        Args:
+            texts: Texts to embed
+            output_path: .npy file to write, replaced only once complete
+            encode_fn: Encode units in this process with this function instead
+                of a process pool, e.g. when the model runs on a GPU
+        """
+        output_path = Path(output_path)
+        partial_path = output_path.with_name(f'{output_path.stem}.partial.npy')
+        checkpoint_path = output_path.with_name(f'{output_path.stem}.checkpoint.json')
+        shape = (len(texts), settings.embedding_dimension)
+        fingerprint = self._fingerprint(texts)
+
+        # Resume from the checkpoint of an interrupted run on the same input
+        done = set()
+        if checkpoint_path.exists() and partial_path.exists():
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('fingerprint') == fingerprint:
+                done = set(checkpoint['units'])
+
+        if done:
+            embeddings = np.load(partial_path, mmap_mode='r+')
+        else:
+            embeddings = np.lib.format.open_memmap(partial_path, mode='w+', dtype=np.float16, shape=shape)
+
+        units = length_sorted_units(texts, self.unit_size)
+        pending = [unit_id for unit_id in range(len(units)) if unit_id not in done]
+        if done:
+            logger.info(f'Resuming embeddings, {len(done)} of {len(units)} units already done')
+
+        # The memmap is passed in rather than closed over, so it can be released before the rename
+        def complete(output: np.memmap, unit_id: int, unit_embeddings: np.ndarray) -> None:
+            output[units[unit_id]] = unit_embeddings
+            output.flush()
+            done.add(unit_id)
+            tmp_path = checkpoint_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fingerprint': fingerprint, 'units': sorted(done)}, f)
+            os.replace(tmp_path, checkpoint_path)
+            logger.info(f'Embedded unit {len(done)}/{len(units)}')
+
+        def unit_texts(unit_id: int) -> List[str]:
+            return [texts[i] for i in units[unit_id]]
+
+        if encode_fn is not None or self.workers == 1:
+            if encode_fn is None:
+                _init_worker(self.threads)
+                encode_fn = _encode_in_worker
+            for unit_id in pending:
+                complete(embeddings, unit_id, encode_fn(unit_texts(unit_id)))
+        else:
+            # Spawned workers do not inherit the parent's torch threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.threads,),
+            ) as pool:
+                # At most two units per worker in flight, which bounds memory
+                queue = iter(pending)
+                in_flight = {}
+                for unit_id in queue:
+                    in_flight[pool.submit(_encode_in_worker, unit_texts(unit_id))] = unit_id
+                    if len(in_flight) >= self.workers * 2:
+                        break
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        complete(embeddings, in_flight.pop(future), future.result())
+                        next_unit = next(queue, None)
+                        if next_unit is not None:
+                            in_flight[pool.submit(_encode_in_worker, unit_texts(next_unit))] = next_unit
+
+        del embeddings
+        os.replace(partial_path, output_path)
+        checkpoint_path.unlink(missing_ok=True)
@@ -1,33 +1,82 @@
 from app.config import settings
+from pathlib import Path
+from typing import List
 import numpy as np
 import pandas as pd
-import math
-from app.utils.embedding_function import embed_function
+import os
+from app.services.embedding_engine import EmbeddingEngine
 from app.config import logger
 
 embedding_dim = settings.embedding_dimension
-batch_size = 128
+batch_size = settings.embedding_batch_size
 chunk_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
 embed_path = Path(settings.embeddings_data_dir) / settings.embeddings_file_name
 
 
 def embed_chunks() :
+    """
+    Embed every chunk into embeddings.npy, row i holding chunk i.
+
+    Chunks are encoded in length-sorted units by a pool of CPU processes, or
+    in this process when a GPU is available. Finished units are
+    checkpointed, so an interrupted run resumes where it stopped.
+    """
+    import torch
+
     df = pd.read_json(chunk_path)
     chunks = df['content'].to_list()
+    del df
 
-    total_chunks = len(chunks)
-    total_batches = math.ceil(total_chunks / batch_size)
-    
-    # Create memmap file
-    embeddings_memmap = np.lib.format.open_memmap(
-        embed_path, mode='w+', dtype=np.float16, shape=(total_chunks, embedding_dim)
-    )
+    encode_fn = None
+    if torch.cuda.is_available():
+        # One process saturates the GPU, encode with the shared model
+        from app.utils.embedding_function import encode_texts
+        encode_fn = encode_texts
 
-    # Loop to write batches of embedded chunks in the memmap
-    for i in range(0, total_chunks, batch_size):
-        batch_texts = chunks[i:i+batch_size]
-        batch_embeddings = embed_function(batch_texts)
-        embeddings_memmap[i:i+len(batch_texts)] = batch_embeddings
+    EmbeddingEngine().embed_to_file(chunks, embed_path, encode_fn=encode_fn)
     
     logger.info('\nEmbeddings complete')
     
+
+
+def update_embeddings(keep: np.ndarray, new_texts: List[str]):
+    """
+    Rewrite embeddings.npy for an incrementally updated chunk file.
+
+    Rows of kept chunks are copied from the current file, only the new
+    chunks are embedded and appended after them.
+
+    Args:
+        keep: Boolean mask over the rows of the current embeddings file
+        new_texts: Contents of the chunks appended to the chunk file
+    """
+    # Imported here, so spawned embedding workers importing this module don't load the model
+    from app.utils.embedding_function import embed_function
+
+    kept_rows = np.flatnonzero(keep)
+    n_kept = len(kept_rows)
+    total_chunks = n_kept + len(new_texts)
+
+    tmp_path = embed_path.with_name(f'{embed_path.stem}.tmp.npy')
+    embeddings_memmap = np.lib.format.open_memmap(
+        tmp_path, mode='w+', dtype=np.float16, shape=(total_chunks, embedding_dim)
+    )
+
+    # Copy the embeddings of unchanged chunks block by block
+    if n_kept:
+        old_embeddings = np.load(embed_path, mmap_mode='r')
+        for i in range(0, n_kept, batch_size * 64):
+            rows = kept_rows[i:i + batch_size * 64]
+            embeddings_memmap[i:i + len(rows)] = old_embeddings[rows]
+        del old_embeddings
+
+    # Embed only the new chunks
+    for i in range(0, len(new_texts), batch_size):
+        batch_texts = new_texts[i:i+batch_size]
+        embeddings_memmap[n_kept + i:n_kept + i + len(batch_texts)] = embed_function(batch_texts)
+
+    embeddings_memmap.flush()
+    del embeddings_memmap
+    os.replace(tmp_path, embed_path)
+
+    logger.info(f'Embeddings updated: {n_kept} reused, {len(new_texts)} embedded')
@@ -1,7 +1,11 @@
-from app.services.keyword_retriever import search_bm25
-from app.services.vector_retriever import qdrant_semantic_search
+import asyncio
+from app.services.keyword_retriever import search_bm25, search_bm25_batch
+from app.services.vector_retriever import semantic_search, semantic_search_async, semantic_search_batch
+from app.utils.executors import search_executor, run_in_executor
+from app.utils.fusion import reciprocal_rank_fusion, merge_contents
+from app.utils.metrics import track_stage, observe_candidates
 from app.config import settings
-from typing import List
+from typing import List, Dict, Tuple
 import pandas as pd
 
 
@@ -22,21 +26,63 @@ def perform_hybrid_search(query: str) -> List[str]:
     bm25_result = search_bm25(query)
 
     # Get the result from vector retriever
-    qdrant_result = qdrant_semantic_search(query)
+    qdrant_result = semantic_search(query)
 
-    joined = pd.merge(bm25_result, qdrant_result, on='job_id', suffixes=('_bm', '_qd'))
+    return fuse_results(bm25_result, qdrant_result)
 
-    joined['rrf'] = (1 / (settings.k + joined['rank_bm'])) + (1 / (settings.k + joined['rank_qd']))
 
-    joined.sort_values(by='rrf', ascending=False, inplace=True)
+async def perform_hybrid_search_async(query: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    '''
+    Async version of `perform_hybrid_search`.
 
-    top_k = joined.iloc[:15].copy()
+    Keyword and semantic search run concurrently, so the latency is that of
+    the slower retriever rather than the sum of both.
+    '''
+    bm25_result, qdrant_result = await asyncio.gather(
+        run_in_executor(search_executor, search_bm25, query),
+        semantic_search_async(query),
+    )
 
-    top_k['combined_contents'] = top_k.apply(
-    lambda row: list(set(row['content_bm'] + row['content_qd'])),
-    axis=1
-)
-    
-    job_ids = top_k['job_id'].to_list()
-    contents = dict(zip(top_k['job_id'], top_k['combined_contents']))
-    return job_ids, contents
\ No newline at end of file
+    return fuse_results(bm25_result, qdrant_result)
+
+
+def perform_hybrid_search_batch(queries: List[str]) -> List[Tuple[List[str], Dict[str, List[str]]]]:
+    '''
+    Batched version of `perform_hybrid_search`.
+
+    Keyword search scores all queries in one pass and semantic search embeds
+    and searches all queries in one call each; fusion then runs per query.
+    '''
+    bm25_results = search_bm25_batch(queries)
+    qdrant_results = semantic_search_batch(queries)
+
+    return [fuse_results(bm25_result, qdrant_result) for bm25_result, qdrant_result in zip(bm25_results, qdrant_results)]
+
+
+def fuse_results(bm25_result: pd.DataFrame, qdrant_result: pd.DataFrame) -> Tuple[List[str], Dict[str, List[str]]]:
+    '''
+    Combines keyword and semantic rankings with weighted reciprocal rank fusion.
+
+    Jobs found by either retriever are candidates, and the top
+    `settings.hybrid_candidates` of them are returned.
+
+    Args:
+    'bm25_result': DataFrame with job_id, rank and content from keyword search.
+    'qdrant_result': DataFrame with job_id, rank and content from semantic search.
+
+    Result:
+    List of document ids
+    Dictionary of contents corresponding to each job id
+    '''
+    with track_stage('fusion'):
+        results = (bm25_result, qdrant_result)
+        job_ids, _ = reciprocal_rank_fusion(
+            [(result['job_id'].to_list(), result['rank'].to_list()) for result in results],
+            k=settings.k,
+            weights=(settings.bm25_weight, settings.semantic_weight),
+            top_n=settings.hybrid_candidates,
+        )
+        contents = merge_contents(job_ids, [dict(zip(result['job_id'], result['content'])) for result in results])
+
+    observe_candidates('fusion', len(job_ids))
+    return job_ids, contents
@@ -0,0 +1,201 @@
+import json
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+from app.services.preprocessing import preprocess_frame, save_processed, raw_data_path, processed_data_path
+from app.services.embeddings import embed_chunks, update_embeddings, embed_path
+from app.utils.chunker import generate_chunks, chunk_job_descriptions, save_chunks_to_json, chunked_data_path
+from app.utils.bm25 import (
+    create_bm25_retriever,
+    load_bm25_index,
+    preprocess_text_for_bm25,
+    keyword_retriever_path,
+)
+from app.utils.job_store import build_job_store, prepare_job_text, job_texts_path
+from app.utils.binary_index import build_binary_index, binary_embeddings_path
+from app.utils.manifest import compute_job_hashes, load_manifest, save_manifest, invalidate_manifest
+from app.utils.vector_store import get_qdrant_client, populate_vectordb, upsert_chunks, delete_chunk_points
+from app.services.streaming_ingestion import streaming_ingestion
+from app.utils.metrics import track_ingestion_step
+from app.config import settings
+from app.config import logger
+
+
+def _artifacts_exist() -> bool:
+    """Whether every output of a previous ingestion run is present."""
+    return all(path.exists() for path in (
+        processed_data_path, job_texts_path, chunked_data_path, embed_path, keyword_retriever_path,
+    ))
+
+
+def full_ingestion(raw_df: pd.DataFrame, job_hashes: Dict[str, str]) -> Dict[str, Any]:
+    """Build every index from scratch and record the manifest."""
+    invalidate_manifest()
+
+    # 1. Preprocess the dataset and store it as json
+    logger.info('\nProcessing the data...')
+    with track_ingestion_step('preprocess'):
+        save_processed(preprocess_frame(raw_df))
+
+    # 2. Precompute the reranker texts of every job
+    logger.info('Preparing job texts for reranking')
+    with track_ingestion_step('job_texts'):
+        build_job_store()
+
+    # 3. Chunk the data
+    logger.info('\nCreating chunks...')
+    with track_ingestion_step('chunk'):
+        chunk_job_descriptions()
+
+    # 4. Generate embeddings
+    logger.info('Genrating embeddings')
+    with track_ingestion_step('embed'):
+        embed_chunks()
+        if settings.vector_backend == 'binary':
+            build_binary_index()
+
+    # 5. Populate keyword retriever
+    logger.info('Initailizing keyword retriever')
+    with track_ingestion_step('bm25'):
+        index_version = create_bm25_retriever()
+
+    # 6. Populate vector database
+    if settings.vector_backend == 'qdrant':
+        logger.info('\nPopulating vector database...')
+        with track_ingestion_step('vector_db'):
+            populate_vectordb(get_qdrant_client())
+
+    chunk_count = len(np.load(embed_path, mmap_mode='r'))
+    return save_manifest(job_hashes, index_version, chunk_count)
+
+
+def incremental_ingestion(
+    raw_df: pd.DataFrame,
+    job_hashes: Dict[str, str],
+    changed: List[str],
+    removed: List[str],
+    manifest: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Apply new, changed and removed jobs to the existing indexes.
+
+    Only changed jobs are cleaned, chunked and embedded. Chunks of unchanged
+    jobs keep their content, embeddings and BM25 postings; the chunks of new
+    and changed jobs are appended after them.
+
+    The chunk file, embeddings and BM25 index must describe the same chunks
+    as the manifest, otherwise everything is rebuilt. The manifest is removed
+    before the first file is rewritten, so a run that dies halfway is
+    followed by a full rebuild rather than an update of mismatched files.
+    """
+    changed_set, stale = set(changed), set(changed) | set(removed)
+    raw_ids = [str(job_id) for job_id in raw_df['ID']]
+
+    with open(chunked_data_path, 'r', encoding='utf-8') as f:
+        old_chunks = json.load(f)
+    old_bm25_index = load_bm25_index(keyword_retriever_path)
+    counts = {
+        'manifest': manifest['chunk_count'],
+        'chunks': len(old_chunks),
+        'embeddings': len(np.load(embed_path, mmap_mode='r')),
+        'bm25': old_bm25_index.corpus_size,
+    }
+    if len(set(counts.values())) > 1 or old_bm25_index.index_version != manifest['index_version']:
+        logger.warning(f'Index artifacts do not line up ({counts}), rebuilding all indexes')
+        return full_ingestion(raw_df, job_hashes)
+
+    invalidate_manifest()
+
+    # 1. Clean only the changed jobs and merge them into processed.json
+    with open(processed_data_path, 'r', encoding='utf-8') as f:
+        old_records = {str(job['ID']): job for job in json.load(f)}
+    changed_df = raw_df[raw_df['ID'].astype(str).isin(changed_set)]
+    new_records = {str(job['ID']): job for job in preprocess_frame(changed_df)} if len(changed_df) else {}
+    save_processed([new_records[job_id] if job_id in changed_set else old_records[job_id] for job_id in raw_ids])
+
+    # 2. Update the precomputed reranker texts
+    with open(job_texts_path, 'r', encoding='utf-8') as f:
+        job_texts = json.load(f)
+    for job_id in removed:
+        job_texts.pop(job_id, None)
+    for job_id, job in new_records.items():
+        job_texts[job_id] = prepare_job_text(job)
+    with open(job_texts_path, 'w', encoding='utf-8') as f:
+        json.dump(job_texts, f, ensure_ascii=False)
+
+    # 3. Drop the chunks of stale jobs and append the chunks of changed jobs
+    keep = np.array([str(chunk['metadata']['job_id']) not in stale for chunk in old_chunks], dtype=bool)
+    new_chunks = [
+        chunk
+        for job_id in raw_ids if job_id in new_records
+        for chunk in generate_chunks(new_records[job_id])
+    ]
+    stale_chunk_ids = [chunk['chunk_id'] for chunk, kept in zip(old_chunks, keep) if not kept]
+    chunks = [chunk for chunk, kept in zip(old_chunks, keep) if kept] + new_chunks
+    save_chunks_to_json(chunks, chunked_data_path)
+
+    # 4. Reuse the embeddings of kept chunks and embed the new ones
+    update_embeddings(keep, [chunk['content'] for chunk in new_chunks])
+    if settings.vector_backend == 'binary' or binary_embeddings_path.exists():
+        build_binary_index()
+
+    # 5. Update the keyword index postings in place of a rebuild
+    bm25_index = old_bm25_index.update(
+        keep, [preprocess_text_for_bm25(chunk['content']) for chunk in new_chunks]
+    )
+    index_version = bm25_index.save(keyword_retriever_path)
+
+    # 6. Delete and upsert only the affected points
+    if settings.vector_backend == 'qdrant':
+        client = get_qdrant_client()
+        if client.collection_exists(collection_name=settings.vector_db_collection_name):
+            delete_chunk_points(client, stale_chunk_ids)
+            embeddings = np.load(embed_path, mmap_mode='r')
+            upsert_chunks(client, new_chunks, embeddings[int(keep.sum()):])
+        else:
+            populate_vectordb(client)
+
+    logger.info(
+        f'Incremental ingestion: {len(changed)} new or changed jobs, {len(removed)} removed, '
+        f'{len(stale_chunk_ids)} chunks dropped, {len(new_chunks)} chunks added'
+    )
+    return save_manifest(job_hashes, index_version, len(chunks))
+
+
+def run_ingestion() -> Dict[str, Any]:
+    """
+    Bring every index up to date with the raw job sheet.
+
+    Jobs are compared to the previous run by a content hash of their raw row.
+    Without a previous run, or if any of its outputs are missing, everything
+    is rebuilt, streamed batch by batch when INGESTION_MODE=stream. Otherwise
+    only new, changed and removed jobs are applied.
+
+    Returns:
+        The manifest of the resulting index version
+    """
+    manifest = load_manifest()
+    if (manifest is None or not _artifacts_exist()) and settings.ingestion_mode == 'stream':
+        # Never load the whole sheet, the raw rows are read and hashed batch by batch
+        logger.info('No complete previous ingestion found, streaming all indexes')
+        with track_ingestion_step('stream'):
+            return streaming_ingestion()
+
+    with track_ingestion_step('read'):
+        raw_df = pd.read_excel(raw_data_path)
+        job_hashes = compute_job_hashes(raw_df)
+
+    if manifest is None or not _artifacts_exist():
+        logger.info('No complete previous ingestion found, building all indexes')
+        return full_ingestion(raw_df, job_hashes)
+
+    old_hashes = manifest['jobs']
+    changed = [job_id for job_id, job_hash in job_hashes.items() if old_hashes.get(job_id) != job_hash]
+    removed = [job_id for job_id in old_hashes if job_id not in job_hashes]
+
+    if not changed and not removed:
+        logger.info(f"Indexes are up to date at version {manifest['index_version']}")
+        return manifest
+
+    with track_ingestion_step('incremental'):
+        return incremental_ingestion(raw_df, job_hashes, changed, removed, manifest)
@@ -1,13 +1,34 @@
-import pickle
-from typing import List, Dict, Any
-from rank_bm25 import BM25Okapi
-from app.utils.bm25 import preprocess_text_for_bm25
+from typing import List, Dict, Any, Optional
+from app.utils.bm25 import preprocess_text_for_bm25, load_bm25_index
+from app.utils.chunk_store import ChunkStore, get_chunk_store
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot, register_index_component
+from app.utils.resources import register_resource
+from app.utils.metrics import track_stage, observe_candidates
 import pandas as pd
 from app.config import settings
+from app.config import logger
 from pathlib import Path
 
 storage_path = Path(settings.keyword_retriever_dir) / settings.keyword_retriever_file
-chunk_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
+
+def _load_keyword_index():
+    index = load_bm25_index(storage_path)
+    logger.info(f'Keyword index {index.index_version} loaded')
+    return index
+
+
+# The index is loaded once per index snapshot, on first use, and shared by every request
+register_index_component('keyword_index', _load_keyword_index)
+
+
+def get_keyword_index(snapshot: Optional[IndexSnapshot] = None):
+    """Return the BM25 index of the served index snapshot, or of `snapshot`, loading it on first use."""
+    return current_snapshot(snapshot).get('keyword_index')
+
+
+def current_index_version() -> str:
+    """Version of the keyword index currently being served."""
+    return get_keyword_index().index_version
 
 
 def search_bm25(query: str) -> List[Dict[str, Any]]:
@@ -22,52 +43,70 @@ def search_bm25(query: str) -> List[Dict[str, Any]]:
         List of retrieved job ids with their ranks
     """
 
-    # Load the model from the pickle file
-    with open(storage_path, 'rb') as f:
-        bm25_retriever = pickle.load(f)
+    with track_stage('bm25'):
+        # Preprocess query
+        query_tokens = preprocess_text_for_bm25(query)
 
-    # Preprocess query
-    query_tokens = preprocess_text_for_bm25(query)
-    
-    # Get BM25 scores for all documents
-    scores = bm25_retriever.get_scores(query_tokens)
-    
-    # Get top-k results
-    top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:100]
-    
-    results = get_doc_ids(ids=top_indices, scores=scores)
-    
+        # Score only the postings of the query terms and keep the top-k chunks,
+        # BM25 rows are looked up in the chunk store of the same snapshot
+        snapshot = current_snapshot()
+        top_indices, scores = get_keyword_index(snapshot).top_k(query_tokens, 100)
+
+        results = get_doc_ids(ids=top_indices, scores=scores, chunk_store=get_chunk_store(snapshot))
+
+    observe_candidates('bm25', len(results))
     return results
 
 
-def get_doc_ids(ids: List[int], scores: List[float]) -> Dict:
+def search_bm25_batch(queries: List[str]) -> List[pd.DataFrame]:
     """
-    Extracts the most relevant document score per unique job ID from a JSON chunk file.
+    Search several queries with a single batched BM25 scoring pass.
+
+    Args:
+        queries: Search query strings
+
+    Returns:
+        One DataFrame of job ids, ranks and contents per query
+    """
+    with track_stage('bm25_batch'):
+        query_tokens = [preprocess_text_for_bm25(query) for query in queries]
+        snapshot = current_snapshot()
+        chunk_store = get_chunk_store(snapshot)
+
+        return [
+            get_doc_ids(ids=top_indices, scores=scores, chunk_store=chunk_store)
+            for top_indices, scores in get_keyword_index(snapshot).top_k_batch(query_tokens, 100)
+        ]
+
+
+def get_doc_ids(ids: List[int], scores: List[float], chunk_store: Optional[ChunkStore] = None) -> Dict:
+    """
+    Extracts the most relevant document score per unique job ID from the chunk store.
 
     Args:
     ids : List[int]
-        List of row indices pointing to relevant chunks in the JSON file.
+        List of row indices pointing to relevant chunks in the chunk store.
     
     scores : List[float]
-        Relevance scores corresponding to each index in `ids`.
+        Relevance scores aligned with `ids`.
+
+    chunk_store : ChunkStore
+        Store the rows refer to, that of the served snapshot by default.
 
     Returns:
     Dict[str, float]
         A dictionary where keys are unique job_id and values are the rank of each job based on average score attained for the job.
     """
 
-    # Read the chunks from json file
-    chunks = pd.read_json(chunk_path)
-
-    # Get only the relevant chunks based on ids
-    relevant_chunks = chunks.iloc[ids]
-    jobs = relevant_chunks.copy()
+    if chunk_store is None:
+        chunk_store = get_chunk_store()
 
-    # Get job ids for each relevant chunk
-    jobs['job_id'] = jobs['metadata'].apply(lambda x: x.get('job_id'))
-
-    # Get score corresponding to each job id
-    jobs['scores'] = [scores[i] for i in ids]
+    # Look up content and job id of each relevant chunk by row
+    jobs = pd.DataFrame({
+        'job_id': chunk_store.job_ids(ids),
+        'content': [chunk_store.contents[i] for i in ids],
+        'scores': scores,
+    })
 
     # Store unique job ids with their average score and retrieved chunks and sort by scores
     job_scores = jobs.groupby('job_id').agg({
@@ -78,4 +117,7 @@ def get_doc_ids(ids: List[int], scores: List[float]) -> Dict:
     # Get ranks for the scores
     job_scores['rank'] = job_scores['scores'].rank(method='first', ascending=False).astype(int)
 
-    return job_scores[['job_id', 'rank', 'content']]
\ No newline at end of file
+    return job_scores[['job_id', 'rank', 'content']]
+
+
+register_resource('keyword_index', get_keyword_index, warmup=lambda index: index.top_k(['warm', 'up'], 10))
@@ -1,5 +1,10 @@
-from app.config import settings
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import List, Dict, Any
 import pandas as pd
 from app.utils.location_cleaner import preprocess_job_location
 from app.utils.tags_cleaner import clean_tags
@@ -10,30 +15,120 @@ from app.config import logger
 
 raw_data_path = Path(settings.raw_data_dir) / settings.file_name
 processed_data_path = Path(settings.processed_data_dir) / settings.processed_file_name
+shards_dir = Path(settings.processed_data_dir) / 'shards'
+
+
+def clean_jobs(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply every cleaner to a frame of raw job rows."""
+    df = df.copy()
+    df['Job Location'] = df['Job Location'].apply(preprocess_job_location)
+    df['Tags'] = df['Tags'].apply(clean_tags)
+    df['cleaned_title'] = df['Job Title'].apply(clean_job_titles)
+    df['Job Description'] = df['Job Description'].apply(html_to_markdown)
+    return df
+
+
+def process_shard(shard: pd.DataFrame, shard_path: Path) -> int:
+    """
+    Clean one shard of rows in a worker process and checkpoint it to disk.
+
+    The shard is written to a temporary file and renamed, so a file at
+    `shard_path` is always a complete shard.
+
+    Returns:
+        Number of rows processed
+    """
+    cleaned = clean_jobs(shard)
+    tmp_path = shard_path.with_suffix('.tmp')
+    cleaned.to_json(tmp_path, orient='records')
+    os.replace(tmp_path, shard_path)
+    return len(cleaned)
+
+
+def _source_fingerprint(df: pd.DataFrame, shard_size: int) -> str:
+    """Identify the input rows and sharding, so checkpoints of another input are not reused."""
+    stat = raw_data_path.stat()
+    ids = hashlib.sha256('\n'.join(map(str, df['ID'].tolist())).encode('utf-8')).hexdigest()
+    key = f'{raw_data_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{shard_size}:{ids}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _prepare_shards_dir(fingerprint: str) -> None:
+    """Keep checkpoints from an interrupted run of the same input, drop anything else."""
+    marker = shards_dir / 'source.json'
+    if marker.exists():
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f).get('fingerprint') == fingerprint:
+                return
+        logger.info('Raw data changed since the last run, discarding preprocessing checkpoints')
+    shutil.rmtree(shards_dir, ignore_errors=True)
+
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'source': str(raw_data_path)}, f)
+
+
+def preprocess_frame(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Clean raw job rows in parallel and return them as JSON records.
+
+    The rows are split into shards of `settings.preprocess_shard_size`,
+    which are cleaned in a process pool. Each finished shard is
+    checkpointed, so an interrupted run resumes with the missing shards only.
+
+    Args:
+        df: Raw job rows
+
+    Returns:
+        Cleaned job records in the order of `df`
+    """
+    shard_size = settings.preprocess_shard_size
+    _prepare_shards_dir(_source_fingerprint(df, shard_size))
+
+    starts = range(0, len(df), shard_size)
+    shard_paths = [shards_dir / f'shard_{start:05d}.json' for start in starts]
+    pending = [(start, path) for start, path in zip(starts, shard_paths) if not path.exists()]
+    if len(pending) < len(shard_paths):
+        logger.info(f'Resuming preprocessing, {len(shard_paths) - len(pending)} of {len(shard_paths)} shards already done')
+
+    # Apply preprocessing, one shard per task
+    workers = settings.preprocess_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(process_shard, df.iloc[start:start + shard_size], path)
+            for start, path in pending
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            logger.info(f'Preprocessed shard {done}/{len(futures)}')
+
+    # Merge the shards in their original order
+    records = []
+    for path in shard_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            records.extend(json.load(f))
+    shutil.rmtree(shards_dir, ignore_errors=True)
+
+    return records
+
+
+def save_processed(records: List[Dict[str, Any]]) -> None:
+    """Write cleaned job records to processed.json."""
+    with open(processed_data_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
 
 def preprocess_dataset():
     """Function to preprocess the dataset and store it as a json file"""
-    
+
     print("Preprocessing the dataset...")
-    
+
     # Load and preprocess data
     df = pd.read_excel(raw_data_path)
-    
-    # Apply preprocessing
-    print('\nCleaning the job location...')
-    df['Job Location'] = df['Job Location'].apply(preprocess_job_location)
-    
-    print('\nCleaning tags...')
-    df['Tags'] = df['Tags'].apply(clean_tags)
+    records = preprocess_frame(df)
 
-    print('\nCleaning title...')
-    df['cleaned_title'] = df['Job Title'].apply(clean_job_titles)
-
-    print('\nCleaning description...')
-    df['Job Description'] = df['Job Description'].apply(html_to_markdown)
-    
     # Save as JSON
-    df.to_json(processed_data_path, orient='records', indent=2)
+    save_processed(records)
     logger.info(f"\nPreprocessing complete. Saved to {processed_data_path}")
-    
-    return
\ No newline at end of file
+
+    return
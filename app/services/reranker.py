@@ -1,95 +1,291 @@
+import argparse
+import asyncio
 import json
+import threading
+import time
 from typing import List, Dict, Any, Tuple, Optional
-from sentence_transformers import CrossEncoder
+import numpy as np
 from app.config import settings
-from pathlib import Path
-
-file_path = Path(settings.processed_data_dir) / settings.processed_file_name
-
-
-def load_jobs():
-    with open(file_path, 'r', encoding='utf-8') as f:
-        processed_data = json.load(f)
-    return processed_data
-
-
-def extract_jobs_by_ids(job_ids: List[str], data_dict) -> List[Dict[str, Any]]:
-    """Extract specific jobs from processed data using job IDs."""
-    
-    job_ids_set = set(job_ids)
-    extracted_jobs = [job for job in data_dict if job['ID'] in job_ids_set]
-    
-    return extracted_jobs
-
-
-def prepare_job_text(job: Dict[str, Any]) -> str:
-    """Prepare job text for cross-encoding by combining relevant fields."""
-    text_parts = []
-    
-    # Job title and category
-    if job.get('Job Title'):
-        text_parts.append(f"Title: {job['Job Title']}")
-    
-    if job.get('Job Category'):
-        text_parts.append(f"Category: {job['Job Category']}")
-    
-    # Company and location
-    if job.get('Company Name'):
-        text_parts.append(f"Company: {job['Company Name']}")
-    
-    if job.get('Job Location'):
-        location_info = job['Job Location']
-        location_parts = []
-        if location_info.get('cities'):
-            location_parts.extend(location_info['cities'])
-        if location_info.get('states'):
-            location_parts.extend(location_info['states'])
-        if location_info.get('countries'):
-            location_parts.extend(location_info['countries'])
-        if location_parts:
-            text_parts.append(f"Location: {', '.join(location_parts)}")
-        if location_info.get('is_remote'):
-            text_parts.append("Remote: Yes")
-    
-    # Job level and description
-    if job.get('Job Level'):
-        text_parts.append(f"Level: {job['Job Level']}")
-    
-    if job.get('Job Description'):
-        # Clean and truncate description
-        description = job['Job Description'].replace('\n', ' ').replace('**', '').strip()
-        text_parts.append(f"Description: {description}")
-    
-    # Tags
-    if job.get('Tags') and job['Tags'] != ['nan']:
-        tags = [tag for tag in job['Tags'] if tag != 'nan']
-        if tags:
-            text_parts.append(f"Tags: {', '.join(tags)}")
-    
-    return " | ".join(text_parts)
-
-cross_encoder = CrossEncoder(settings.reranker_model)
+from app.config import logger
+from app.utils.job_store import get_job_store
+from app.utils.index_snapshot import current_snapshot
+from app.utils.chunk_store import get_chunk_store
+from app.utils.local_vector_index import get_local_vector_index
+from app.utils.embedding_function import embed_function, embed_function_async
+from app.utils.executors import model_executor, run_in_executor
+from app.utils.batcher import MicroBatcher
+from app.utils.model_backend import load_cross_encoder
+from app.utils.resources import register_resource
+from app.utils.metrics import observe_batch_size, observe_candidates
 
-def rerank_jobs(job_ids: List[str], query: str) -> List[Dict[str, Any]]:
-    """Rerank jobs using cross-encoder based on query relevance."""  
-    # Get all the jobs
-    data = load_jobs()
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Return the process-wide cross-encoder, loading it on first use."""
+    global _cross_encoder
+
+    if _cross_encoder is None:
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                # Load the model with the configured inference backend
+                _cross_encoder = load_cross_encoder()
+                logger.info(f'Reranker model {settings.reranker_model} loaded')
+    return _cross_encoder
+
+
+def predict_pairs(pairs: List[Tuple[str, str]]):
+    """Score query-document pairs in a single cross-encoder call."""
+    observe_batch_size('cross_encoder', len(pairs))
+    return get_cross_encoder().predict(pairs, batch_size=settings.reranker_batch_size)
+
+
+register_resource(
+    'cross_encoder',
+    get_cross_encoder,
+    warmup=lambda model: predict_pairs([('warm up query', 'warm up job description')]),
+)
+
+
+# Pairs from concurrent requests are scored together
+rerank_batcher = MicroBatcher(
+    predict_pairs,
+    max_batch_size=settings.reranker_micro_batch_size,
+    max_wait_ms=settings.micro_batch_max_wait_ms,
+    name='reranker-batcher',
+)
+
+
+def prescore_jobs(job_ids: List[str], query_embedding: np.ndarray) -> np.ndarray:
+    """
+    Cheap bi-encoder score of each job: the best cosine similarity of the query to any of its chunks.
+
+    Uses the stored chunk embeddings, so no model runs. Jobs without chunks score -inf.
+    """
+    # Chunk rows and embedding rows must come from the same snapshot
+    snapshot = current_snapshot()
+    chunk_store = get_chunk_store(snapshot)
+    rows_per_job = [chunk_store.rows_for_job(job_id) for job_id in job_ids]
+    counts = np.array([len(rows) for rows in rows_per_job], dtype=np.int64)
+
+    scores = np.full(len(job_ids), -np.inf, dtype=np.float32)
+    if not counts.sum():
+        return scores
+
+    rows = np.concatenate(rows_per_job)
+    embeddings = np.asarray(get_local_vector_index(snapshot).embeddings[rows], dtype=np.float32)
+    similarities = embeddings @ np.asarray(query_embedding, dtype=np.float32)
+
+    # Max over each job's slice of rows, empty slices are skipped
+    has_rows = counts > 0
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    scores[has_rows] = np.maximum.reduceat(similarities, starts[has_rows])
+    return scores
 
-    # Get the jobs
-    jobs = extract_jobs_by_ids(job_ids, data)
 
-    # Prepare job texts
-    job_texts = [prepare_job_text(job) for job in jobs]
-    
+def cascade_head(job_ids: List[str], query_embedding: np.ndarray) -> List[str]:
+    """
+    The candidates the cross-encoder still has to order.
+
+    Candidates are ranked by `prescore_jobs`. Everything within
+    `settings.cascade_margin` of the top_k-th prescore could still make the
+    top k and is kept, along with at least `settings.cascade_min_candidates`;
+    candidates further below are dropped. A decisive ranking therefore sends
+    few candidates to the cross-encoder, a flat one sends most of them.
+
+    Returns:
+        The kept job ids, best prescore first
+    """
+    top_k = settings.reranker_top_k
+    if len(job_ids) <= max(top_k, settings.cascade_min_candidates):
+        return list(job_ids)
+
+    scores = prescore_jobs(job_ids, query_embedding)
+    order = np.argsort(-scores, kind='stable')
+    boundary = scores[order[top_k - 1]]
+    head = max(int(np.count_nonzero(scores >= boundary - settings.cascade_margin)), settings.cascade_min_candidates)
+
+    return [job_ids[i] for i in order[:head]]
+
+
+def build_rerank_pairs(job_ids: List[str], query: str, query_embedding=None) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+    """
+    Build the cross-encoder input of one query.
+
+    Args:
+        job_ids: Candidate job ids, best first
+        query: User query
+        query_embedding: Embedding of the query, only used in cascade mode
+
+    Returns:
+        (jobs, pairs), the jobs to score and their (query, job text) pairs
+    """
+    job_store = get_job_store()
+    observe_candidates('rerank', len(job_ids))
+
+    # Only the uncertain head goes to the cross-encoder, the query embedding is cached by semantic search
+    if settings.rerank_mode == 'cascade':
+        if query_embedding is None:
+            query_embedding = embed_function(query)
+        job_ids = cascade_head(job_ids, query_embedding)
+        observe_candidates('cross_encoder', len(job_ids))
+
+    # Get the jobs and their precomputed texts
+    jobs = job_store.get_jobs(job_ids)
+    job_texts = job_store.get_texts(job_ids)
+
     # Create query-document pairs for cross-encoder
-    pairs = [(query, job_text) for job_text in job_texts]
-    
-    # Get relevance scores from cross-encoder
-    scores = cross_encoder.predict(pairs)
-    
-    # Combine jobs with scores and sort by relevance
+    return jobs, [(query, job_text) for job_text in job_texts]
+
+
+def order_by_scores(jobs: List[Dict[str, Any]], scores) -> List[Dict[str, Any]]:
+    """Sort jobs by their cross-encoder scores and keep the top_k."""
     job_score_pairs = list(zip(jobs, scores))
     job_score_pairs.sort(key=lambda x: x[1], reverse=True)
-    
-    # Return top_k results
-    return [job for job, score in job_score_pairs[:settings.reranker_top_k]]
\ No newline at end of file
+    return [job for job, score in job_score_pairs[:settings.reranker_top_k]]
+
+
+def rerank_jobs(job_ids: List[str], query: str) -> List[Dict[str, Any]]:
+    """Rerank jobs using cross-encoder based on query relevance."""
+    jobs, pairs = build_rerank_pairs(job_ids, query)
+
+    # Get relevance scores from cross-encoder
+    if settings.micro_batch_enabled:
+        scores = rerank_batcher(pairs)
+    else:
+        scores = predict_pairs(pairs)
+
+    return order_by_scores(jobs, scores)
+
+
+async def rerank_jobs_async(job_ids: List[str], query: str) -> List[Dict[str, Any]]:
+    """
+    Rerank jobs without blocking the event loop.
+
+    With micro-batching the pairs are handed to the batcher and awaited
+    directly, so no executor thread is held while the batch fills.
+    """
+    query_embedding = await embed_function_async(query) if settings.rerank_mode == 'cascade' else None
+    jobs, pairs = build_rerank_pairs(job_ids, query, query_embedding)
+
+    if settings.micro_batch_enabled:
+        scores = await asyncio.wrap_future(rerank_batcher.submit(pairs))
+    else:
+        scores = await run_in_executor(model_executor, predict_pairs, pairs)
+
+    return order_by_scores(jobs, scores)
+
+
+def rerank_jobs_batch(job_ids_list: List[List[str]], queries: List[str]) -> List[List[Dict[str, Any]]]:
+    """Rerank the candidates of several queries with a single cross-encoder call."""
+    job_store = get_job_store()
+
+    if settings.rerank_mode == 'cascade' and queries:
+        query_embeddings = embed_function(queries)
+        job_ids_list = [
+            cascade_head(job_ids, query_embedding)
+            for job_ids, query_embedding in zip(job_ids_list, query_embeddings)
+        ]
+
+    # Build the pairs of every query and remember where each query's pairs start
+    jobs_list, pairs, offsets = [], [], [0]
+    for job_ids, query in zip(job_ids_list, queries):
+        jobs = job_store.get_jobs(job_ids)
+        jobs_list.append(jobs)
+        pairs.extend((query, job_text) for job_text in job_store.get_texts(job_ids))
+        offsets.append(len(pairs))
+
+    # Score all (query, job) pairs at once
+    scores = predict_pairs(pairs) if pairs else []
+
+    results = []
+    for i, jobs in enumerate(jobs_list):
+        results.append(order_by_scores(jobs, scores[offsets[i]:offsets[i + 1]]))
+
+    return results
+
+
+def _cross_encoder_top_k(job_ids: List[str], query: str) -> List[str]:
+    """Ids of the top_k jobs by cross-encoder score, scored in one direct model call."""
+    job_store = get_job_store()
+    known = [job_id for job_id in job_ids if job_id in job_store.jobs]
+    if not known:
+        return []
+    scores = predict_pairs([(query, job_text) for job_text in job_store.get_texts(known)])
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    return [known[i] for i in order[:settings.reranker_top_k]]
+
+
+def evaluate_cascade(queries: Optional[List[str]] = None, n_queries: int = 200, seed: int = 0) -> dict:
+    """
+    Compare cascade reranking against reranking every fused candidate.
+
+    Without `queries`, job titles sampled from the job store are used. Both
+    modes rerank the same hybrid search candidates with the same model.
+
+    Args:
+        queries: Queries to evaluate on
+        n_queries: Number of sampled job titles when no queries are given
+        seed: Random seed for the sample
+
+    Returns:
+        Dictionary with top-k agreement, cross-encoder pairs and latencies of both modes
+    """
+    from app.services.hybrid_search import perform_hybrid_search
+
+    if queries is None:
+        titles = sorted({str(job['Job Title']) for job in get_job_store().jobs.values() if job.get('Job Title')})
+        rng = np.random.default_rng(seed)
+        queries = [titles[i] for i in rng.choice(len(titles), size=min(n_queries, len(titles)), replace=False)]
+
+    same_set = same_order = overlap = 0.0
+    full_pairs = cascade_pairs = 0
+    full_ms, cascade_ms = [], []
+    for query in queries:
+        job_ids, _ = perform_hybrid_search(query)
+        query_embedding = embed_function(query)
+
+        started = time.perf_counter()
+        full = _cross_encoder_top_k(job_ids, query)
+        full_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        head = cascade_head(job_ids, query_embedding)
+        cascade = _cross_encoder_top_k(head, query)
+        cascade_ms.append((time.perf_counter() - started) * 1000)
+
+        full_pairs += len(job_ids)
+        cascade_pairs += len(head)
+        same_set += set(full) == set(cascade)
+        same_order += full == cascade
+        overlap += len(set(full) & set(cascade)) / max(len(full), 1)
+
+    n = max(len(queries), 1)
+    return {
+        'queries': len(queries),
+        'top_k': settings.reranker_top_k,
+        'cascade_margin': settings.cascade_margin,
+        'cascade_min_candidates': settings.cascade_min_candidates,
+        'same_top_k_set': same_set / n,
+        'same_top_k_order': same_order / n,
+        'mean_overlap_at_k': overlap / n,
+        'mean_pairs_full': full_pairs / n,
+        'mean_pairs_cascade': cascade_pairs / n,
+        'mean_ms_full': float(np.mean(full_ms)) if full_ms else 0.0,
+        'mean_ms_cascade': float(np.mean(cascade_ms)) if cascade_ms else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare cascade reranking against full cross-encoder reranking')
+    parser.add_argument('--queries-file', help='File with one query per line, job titles are sampled otherwise')
+    parser.add_argument('--queries', type=int, default=200, help='Number of sampled job titles')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    queries = None
+    if args.queries_file:
+        with open(args.queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    print(json.dumps(evaluate_cascade(queries, n_queries=args.queries, seed=args.seed), indent=2))
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import threading
+from typing import Any, Iterable, Optional
+from app.utils.cache import LRUCache, normalize_query
+from app.services.keyword_retriever import current_index_version
+from app.services.LLM_integration import PROMPT_VERSION
+from app.utils.metrics import observe_cache
+from app.config import settings
+from app.config import logger
+
+
+class InMemoryCacheBackend:
+    """Per-process cache backend, bounded by an LRU."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.cache.set(key, value)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class LocalSharedClient:
+    """
+    In-process stand-in for a Redis client, implementing the subset used by
+    SharedCacheBackend. Useful for tests and single machine runs.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, name: str) -> Optional[bytes]:
+        return self._cache.get(name)
+
+    def set(self, name: str, value: Any, ex: Optional[int] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        # Like Redis, `ex` is the entry's time to live in seconds
+        self._cache.set(name, value, ttl=ex)
+        return True
+
+    def flushdb(self) -> bool:
+        self._cache.clear()
+        return True
+
+
+class SharedCacheBackend:
+    """
+    Cache backend on a shared key-value store such as Redis, so every worker
+    process sees the same entries.
+
+    Size is bounded by the store's own eviction policy (e.g. Redis with
+    maxmemory and allkeys-lru), entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, client, namespace: str, ttl: Optional[float] = None):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = int(ttl) if ttl else None
+
+    def _key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self._key(key))
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self._key(key), json.dumps(value), ex=self.ttl)
+
+    def clear(self) -> None:
+        # Entries of older index versions are unreachable and left to expire
+        return
+
+
+class ResultCache:
+    """
+    Two level cache for the query pipeline.
+
+    The answer level maps a normalised query to the final pipeline output and
+    skips the whole pipeline on a hit. The LLM level maps (query, reranked job
+    IDs, model, prompt version) to the LLM answer and skips only the LLM call.
+    Every key includes the index version, so a rebuilt index invalidates both
+    levels automatically.
+    """
+
+    def __init__(self, answer_backend, llm_backend):
+        self.answer_backend = answer_backend
+        self.llm_backend = llm_backend
+        self.hits = {'answer': 0, 'llm': 0}
+        self.misses = {'answer': 0, 'llm': 0}
+        self._index_version = None
+        self._lock = threading.Lock()
+
+    def _current_version(self) -> str:
+        """Return the index version, dropping local entries when it changed."""
+        version = current_index_version()
+        if version != self._index_version:
+            with self._lock:
+                if version != self._index_version:
+                    if self._index_version is not None:
+                        logger.info(f'Index version changed to {version}, clearing result cache')
+                    self.answer_backend.clear()
+                    self.llm_backend.clear()
+                    self._index_version = version
+        return version
+
+    @staticmethod
+    def _hash(*parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _lookup(self, level: str, backend, key: str) -> Optional[Any]:
+        value = backend.get(key)
+        observe_cache(f'{level}_result', value is not None)
+        if value is None:
+            self.misses[level] += 1
+        else:
+            self.hits[level] += 1
+        return value
+
+    def answer_key(self, query: str) -> str:
+        return self._hash(self._current_version(), normalize_query(query))
+
+    def llm_key(self, query: str, job_ids: Iterable[str]) -> str:
+        return self._hash(
+            self._current_version(),
+            normalize_query(query),
+            sorted(job_ids),
+            settings.llm_model,
+            PROMPT_VERSION,
+        )
+
+    def get_answer(self, query: str) -> Optional[Any]:
+        return self._lookup('answer', self.answer_backend, self.answer_key(query))
+
+    def set_answer(self, query: str, answer: Any) -> None:
+        self.answer_backend.set(self.answer_key(query), answer)
+
+    def get_llm_answer(self, query: str, job_ids: Iterable[str]) -> Optional[str]:
+        return self._lookup('llm', self.llm_backend, self.llm_key(query, job_ids))
+
+    def set_llm_answer(self, query: str, job_ids: Iterable[str], answer: str) -> None:
+        self.llm_backend.set(self.llm_key(query, job_ids), answer)
+
+    def stats(self):
+        return {'hits': dict(self.hits), 'misses': dict(self.misses)}
+
+
+def create_result_cache() -> ResultCache:
+    """Build the result cache for the backend selected in settings."""
+    if settings.result_cache_backend == 'memory':
+        return ResultCache(
+            answer_backend=InMemoryCacheBackend(settings.result_cache_size, settings.result_cache_ttl),
+            llm_backend=InMemoryCacheBackend(settings.llm_cache_size, settings.result_cache_ttl),
+        )
+
+    if settings.result_cache_backend == 'local':
+        client = LocalSharedClient(maxsize=settings.result_cache_size + settings.llm_cache_size)
+    elif settings.result_cache_backend == 'redis':
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError('RESULT_CACHE_BACKEND=redis requires the redis package: pip install redis') from e
+        client = redis.Redis.from_url(settings.result_cache_redis_url)
+    else:
+        raise ValueError(f'Unknown result cache backend: {settings.result_cache_backend}')
+
+    return ResultCache(
+        answer_backend=SharedCacheBackend(client, 'answer', settings.result_cache_ttl),
+        llm_backend=SharedCacheBackend(client, 'llm', settings.result_cache_ttl),
+    )
+
+
+result_cache = create_result_cache()
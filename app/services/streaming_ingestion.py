@@ -0,0 +1,142 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from app.services.preprocessing import clean_jobs, raw_data_path, processed_data_path
+from app.services.embeddings import embed_path, embedding_dim
+from app.utils.chunker import generate_chunks, chunked_data_path
+from app.utils.bm25 import BM25Builder, preprocess_text_for_bm25, keyword_retriever_path
+from app.utils.job_store import prepare_job_text, job_texts_path
+from app.utils.binary_index import build_binary_index
+from app.utils.manifest import job_content_hash, save_manifest, invalidate_manifest
+from app.utils.json_writer import JsonArrayWriter, JsonObjectWriter
+from app.utils.vector_store import get_qdrant_client, upsert_chunks, recreate_collection, enable_indexing
+from app.config import settings
+from app.config import logger
+
+
+def iter_raw_batches(batch_size: int) -> Iterator[pd.DataFrame]:
+    """Read the raw sheet row by row and yield frames of at most `batch_size` jobs."""
+    workbook = load_workbook(raw_data_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                # Empty cells become NaN, as with pd.read_excel
+                yield pd.DataFrame(batch, columns=header).replace({None: np.nan})
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header).replace({None: np.nan})
+    finally:
+        workbook.close()
+
+
+def clean_batch(raw_batch: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Clean a raw batch in a worker process and return JSON records."""
+    return json.loads(clean_jobs(raw_batch).to_json(orient='records'))
+
+
+def iter_clean_batches(raw_batches: Iterator[pd.DataFrame]) -> Iterator[tuple]:
+    """
+    Clean raw batches in a process pool, yielding (raw batch, records) in input order.
+
+    At most two batches per worker are in flight, which bounds memory.
+    """
+    workers = settings.preprocess_workers or os.cpu_count() or 1
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for raw_batch in raw_batches:
+            in_flight.append((raw_batch, pool.submit(clean_batch, raw_batch)))
+            if len(in_flight) >= workers * 2:
+                raw, future = in_flight.popleft()
+                yield raw, future.result()
+        while in_flight:
+            raw, future = in_flight.popleft()
+            yield raw, future.result()
+
+
+def streaming_ingestion() -> Dict[str, Any]:
+    """
+    Build every index from the raw sheet in bounded batches.
+
+    Batches of `settings.stream_batch_size` jobs flow through
+    clean -> chunk -> embed -> upsert, and every output file is written
+    incrementally, so peak memory does not grow with the dataset. Only the
+    BM25 postings, which are the index itself, and the per-job hashes grow.
+
+    Returns:
+        The manifest of the built index version
+    """
+    # Imported here, so spawned embedding workers importing this module don't load the model
+    from app.utils.embedding_function import embed_function
+
+    invalidate_manifest()
+    upload = settings.vector_backend == 'qdrant'
+    if upload:
+        client = get_qdrant_client()
+        recreate_collection(client)
+
+    processed_writer = JsonArrayWriter(processed_data_path)
+    chunk_writer = JsonArrayWriter(chunked_data_path)
+    texts_writer = JsonObjectWriter(job_texts_path)
+    raw_vectors_path = embed_path.with_name(f'{embed_path.stem}.raw.tmp')
+    bm25_builder = BM25Builder()
+    job_hashes: Dict[str, str] = {}
+    chunk_count = 0
+
+    with open(raw_vectors_path, 'wb') as raw_vectors:
+        for raw_batch, records in iter_clean_batches(iter_raw_batches(settings.stream_batch_size)):
+            for job in raw_batch.to_dict(orient='records'):
+                job_hashes[str(job['ID'])] = job_content_hash(job)
+
+            chunks = []
+            for job in records:
+                processed_writer.write(job)
+                texts_writer.write_item(str(job['ID']), prepare_job_text(job))
+                chunks.extend(generate_chunks(job))
+
+            if chunks:
+                embeddings = np.asarray(embed_function([chunk['content'] for chunk in chunks]), dtype=np.float16)
+                raw_vectors.write(embeddings.tobytes())
+                for chunk in chunks:
+                    chunk_writer.write(chunk)
+                    bm25_builder.add(preprocess_text_for_bm25(chunk['content']))
+                if upload:
+                    upsert_chunks(client, chunks, embeddings)
+                chunk_count += len(chunks)
+
+            logger.info(f'Streamed {len(job_hashes)} jobs, {chunk_count} chunks')
+
+    processed_writer.close()
+    texts_writer.close()
+    chunk_writer.close()
+    if upload:
+        enable_indexing(client)
+
+    # Give the raw vectors an .npy header by copying them block by block
+    vectors = np.memmap(raw_vectors_path, dtype=np.float16, mode='r', shape=(chunk_count, embedding_dim))
+    embeddings_memmap = np.lib.format.open_memmap(
+        embed_path, mode='w+', dtype=np.float16, shape=(chunk_count, embedding_dim)
+    )
+    for start in range(0, chunk_count, 65536):
+        embeddings_memmap[start:start + 65536] = vectors[start:start + 65536]
+    embeddings_memmap.flush()
+    del vectors, embeddings_memmap
+    os.remove(raw_vectors_path)
+
+    if settings.vector_backend == 'binary':
+        build_binary_index()
+
+    bm25_index = bm25_builder.build(k1=settings.bm25_k1, b=settings.bm25_b)
+    index_version = bm25_index.save(keyword_retriever_path)
+    logger.info(f'BM25 index {index_version} saved to {keyword_retriever_path}')
+
+    return save_manifest(job_hashes, index_version, chunk_count)
@@ -1,17 +1,18 @@
-from app.utils.vector_store import get_qdrant_client
-from app.utils.embedding_function import embed_function
-from typing import List, Dict, Any
+from app.utils.vector_store import get_qdrant_client, get_async_qdrant_client
+from app.utils.embedding_function import embed_function, embed_function_async
+from app.utils.chunk_store import ChunkStore, get_chunk_store
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot
+from app.utils.local_vector_index import get_local_vector_index
+from app.utils.binary_index import get_binary_vector_index
+from app.utils.executors import search_executor, run_in_executor
+from app.utils.metrics import track_stage, track_external_call, observe_candidates
+from typing import List, Dict, Any, Optional
+from qdrant_client import models
 from app.config import settings
-from pathlib import Path
 from collections import defaultdict
 import pandas as pd
 
 
-chunk_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
-
-chunks_data = pd.read_json(chunk_path)
-
-
 def qdrant_semantic_search(query: str) -> pd.DataFrame:
     """
     Perform semantic search in Qdrant collection
@@ -30,24 +31,192 @@ def qdrant_semantic_search(query: str) -> pd.DataFrame:
     query_embedding = embed_function(query)
     
     # Perform the search
-    search_results = client.query_points(
-        collection_name=settings.vector_db_collection_name,
-        query=query_embedding,
-        limit=100,
-    )
+    with track_external_call('qdrant', 'query_points'):
+        search_results = client.query_points(
+            collection_name=settings.vector_db_collection_name,
+            query=query_embedding,
+            limit=100,
+            timeout=settings.vector_db_search_timeout,
+        )
+
+    return aggregate_points(search_results.points)
+
+
+async def qdrant_semantic_search_async(query: str) -> pd.DataFrame:
+    """
+    Async version of `qdrant_semantic_search`.
+
+    The query embedding is awaited from the embedding batcher and the search
+    on the shared async Qdrant client.
+    """
+    client = get_async_qdrant_client()
+
+    # Get embedding for the query without blocking the event loop
+    query_embedding = await embed_function_async(query)
+
+    # Perform the search
+    with track_external_call('qdrant', 'query_points'):
+        search_results = await client.query_points(
+            collection_name=settings.vector_db_collection_name,
+            query=query_embedding,
+            limit=100,
+            timeout=settings.vector_db_search_timeout,
+        )
+
+    return aggregate_points(search_results.points)
+
+
+def qdrant_semantic_search_batch(queries: List[str]) -> List[pd.DataFrame]:
+    """
+    Semantic search for several queries.
+
+    All queries are embedded in one model call and searched with a single
+    Qdrant batch request.
+
+    Args:
+        queries: Query strings
+
+    Returns:
+        One DataFrame with columns job_id, rank, content per query
+    """
+    client = get_qdrant_client()
+
+    # Embed every query in one forward pass
+    query_embeddings = embed_function(queries)
+
+    with track_external_call('qdrant', 'query_batch_points'):
+        search_results = client.query_batch_points(
+            collection_name=settings.vector_db_collection_name,
+            requests=[
+                models.QueryRequest(query=embedding.tolist(), limit=100, with_payload=True)
+                for embedding in query_embeddings
+            ],
+            timeout=settings.vector_db_search_timeout,
+        )
+
+    return [aggregate_points(result.points) for result in search_results]
+
+
+def get_in_process_index(snapshot: Optional[IndexSnapshot] = None):
+    """The in-process index for the selected backend: binary codes or exact float search."""
+    if settings.vector_backend == 'binary':
+        return get_binary_vector_index(snapshot)
+    return get_local_vector_index(snapshot)
+
+
+def local_semantic_search(query: str) -> pd.DataFrame:
+    """
+    Semantic search over the local embeddings, without Qdrant.
+
+    Returns the same DataFrame as `qdrant_semantic_search`.
+    """
+    query_embedding = embed_function(query)
+    # Vector rows are looked up in the chunk store of the same snapshot
+    snapshot = current_snapshot()
+    rows, scores = get_in_process_index(snapshot).search(query_embedding, 100)
+
+    return aggregate_rows(rows, scores, get_chunk_store(snapshot))
 
-    points = search_results.points
 
-    # Accumulate scores and point IDs per job_id
-    job_data = defaultdict(lambda: {'scores': [], 'point_ids': []})
+async def local_semantic_search_async(query: str) -> pd.DataFrame:
+    """Async version of `local_semantic_search`."""
+    query_embedding = await embed_function_async(query)
+    snapshot = current_snapshot()
+    rows, scores = await run_in_executor(search_executor, get_in_process_index(snapshot).search, query_embedding, 100)
 
+    return aggregate_rows(rows, scores, get_chunk_store(snapshot))
+
+
+def local_semantic_search_batch(queries: List[str]) -> List[pd.DataFrame]:
+    """Batched version of `local_semantic_search`, one matrix product per block for all queries."""
+    query_embeddings = embed_function(queries)
+    snapshot = current_snapshot()
+    chunk_store = get_chunk_store(snapshot)
+
+    return [
+        aggregate_rows(rows, scores, chunk_store)
+        for rows, scores in get_in_process_index(snapshot).search_batch(query_embeddings, 100)
+    ]
+
+
+def semantic_search(query: str) -> pd.DataFrame:
+    """Semantic search on the backend selected by settings.vector_backend."""
+    with track_stage('semantic'):
+        if settings.vector_backend in ('local', 'binary'):
+            result = local_semantic_search(query)
+        else:
+            result = qdrant_semantic_search(query)
+
+    observe_candidates('semantic', len(result))
+    return result
+
+
+async def semantic_search_async(query: str) -> pd.DataFrame:
+    """Async semantic search on the backend selected by settings.vector_backend."""
+    with track_stage('semantic'):
+        if settings.vector_backend in ('local', 'binary'):
+            result = await local_semantic_search_async(query)
+        else:
+            result = await qdrant_semantic_search_async(query)
+
+    observe_candidates('semantic', len(result))
+    return result
+
+
+def semantic_search_batch(queries: List[str]) -> List[pd.DataFrame]:
+    """Batched semantic search on the backend selected by settings.vector_backend."""
+    with track_stage('semantic_batch'):
+        if settings.vector_backend in ('local', 'binary'):
+            return local_semantic_search_batch(queries)
+        return qdrant_semantic_search_batch(queries)
+
+
+def aggregate_points(points) -> pd.DataFrame:
+    """
+    Group scored Qdrant points by job and rank jobs by their average score.
+
+    Args:
+        points: Scored points
+
+    Returns:
+        DataFrame with columns: job_id, rank, content
+    """
+    chunk_store = get_chunk_store()
+    rows, scores = [], []
     for point in points:
-        job_id = point.payload['job_id']
-        score = point.score
-        point_id = point.id
+        # Points upserted by an ingestion run this process hasn't reloaded yet are skipped
+        row = chunk_store.find_row(point.id)
+        if row is not None:
+            rows.append(row)
+            scores.append(point.score)
+
+    return aggregate_rows(rows, scores, chunk_store)
+
+
+def aggregate_rows(rows, scores, chunk_store: Optional[ChunkStore] = None) -> pd.DataFrame:
+    """
+    Group scored chunk rows by job and rank jobs by their average score.
+
+    Args:
+        rows: Chunk store rows of the hits
+        scores: Similarity score of each hit
+        chunk_store: Store the rows refer to, that of the served snapshot by default
+
+    Returns:
+        DataFrame with columns: job_id, rank, content
+        where content is a list of chunks for each job_id
+    """
+    if chunk_store is None:
+        chunk_store = get_chunk_store()
+
+    # Accumulate scores and rows per job_id
+    job_data = defaultdict(lambda: {'scores': [], 'rows': []})
+
+    for row, score in zip(rows, scores):
+        job_id = chunk_store.job_id(row)
         
-        job_data[job_id]['scores'].append(score)
-        job_data[job_id]['point_ids'].append(point_id)
+        job_data[job_id]['scores'].append(float(score))
+        job_data[job_id]['rows'].append(row)
 
     # Compute average score per job_id
     job_avg_scores = {}
@@ -61,13 +230,8 @@ def qdrant_semantic_search(query: str) -> pd.DataFrame:
     df_data = []
     
     for rank, (job_id, avg_score) in enumerate(sorted_jobs, 1):
-        # Get all point IDs for this job
-        point_ids = job_data[job_id]['point_ids']
-        
-        # Retrieve content chunks for all points of this job
-        content_chunks = []
-        for point_id in point_ids:
-            content_chunks.append(str(chunks_data[chunks_data['chunk_id'] == point_id]['content']))
+        # Retrieve content chunks for all hits of this job
+        content_chunks = [chunk_store.contents[row] for row in job_data[job_id]['rows']]
         
         df_data.append({
             'job_id': job_id,
@@ -76,6 +240,6 @@ def qdrant_semantic_search(query: str) -> pd.DataFrame:
         })
     
     # Create DataFrame
-    df = pd.DataFrame(df_data)
+    df = pd.DataFrame(df_data, columns=['job_id', 'rank', 'content'])
     
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Sequence
+from app.config import logger
+
+
+class _BatchRequest:
+    __slots__ = ('items', 'future')
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """
+    Merges concurrent inference calls into one batched model call.
+
+    Callers submit a list of inputs and get a Future for the matching list of
+    outputs. A background thread collects requests until `max_batch_size`
+    inputs are queued or `max_wait_ms` has passed since the first one arrived,
+    calls `batch_fn` once on all of them and hands each caller its slice.
+    A single request is never split across batches.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = 'batcher',
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: 'queue.Queue[_BatchRequest]' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List[Any]) -> Future:
+        """Queue `items` for the next batch and return a Future of their outputs."""
+        request = _BatchRequest(list(items))
+        if not request.items:
+            request.future.set_result([])
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def __call__(self, items: List[Any]) -> Sequence[Any]:
+        """Blocking version of `submit`."""
+        return self.submit(items).result()
+
+    def _collect(self) -> List[_BatchRequest]:
+        """Wait for one request, then gather more until the batch is full or the wait is over."""
+        pending = [self._queue.get()]
+        size = len(pending[0].items)
+        deadline = time.monotonic() + self.max_wait
+
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(request)
+            size += len(request.items)
+
+        return pending
+
+    @staticmethod
+    def _settle(future: Future, result: Any = None, exception: BaseException = None) -> None:
+        # A future can't be cancelled once running, the guard only covers misuse
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self) -> None:
+        # Nothing may end this thread, every later submit would wait forever
+        while True:
+            try:
+                self._run_batch()
+            except Exception:
+                logger.exception(f'{self._thread.name} failed to run a batch')
+
+    def _run_batch(self) -> None:
+        # Drop requests whose caller cancelled, e.g. on a deadline; the rest can no longer be cancelled
+        pending = [request for request in self._collect() if request.future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+        inputs = [item for request in pending for item in request.items]
+
+        try:
+            outputs = self.batch_fn(inputs)
+
+            # Hand every caller the outputs for its own inputs
+            results, offset = [], 0
+            for request in pending:
+                size = len(request.items)
+                results.append(outputs[offset:offset + size])
+                offset += size
+        except Exception as e:
+            for request in pending:
+                self._settle(request.future, exception=e)
+            return
+
+        for request, result in zip(pending, results):
+            self._settle(request.future, result)
@@ -0,0 +1,192 @@
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.config import logger
+from app.utils.resources import register_resource
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot, register_index_component
+from app.utils.local_vector_index import LocalVectorIndex, embeddings_path
+
+binary_embeddings_path = Path(settings.embeddings_data_dir) / settings.binary_embeddings_file_name
+
+# Number of set bits of every byte value, for numpy builds without bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    """Set bits per row of a packed uint8 code matrix."""
+    if hasattr(np, 'bitwise_count'):
+        counts = np.bitwise_count(codes)
+    else:
+        counts = _POPCOUNT_TABLE[codes]
+    return counts.sum(axis=1, dtype=np.uint16)
+
+
+def build_binary_index(block_size: int = 65536) -> Path:
+    """
+    Quantize embeddings.npy to one sign bit per dimension and save the packed codes.
+
+    A 384 dimensional float16 vector (768 bytes) becomes 48 bytes.
+
+    Returns:
+        Path of the written code file
+    """
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    n_rows, dim = embeddings.shape
+
+    codes = np.lib.format.open_memmap(
+        binary_embeddings_path, mode='w+', dtype=np.uint8, shape=(n_rows, (dim + 7) // 8)
+    )
+    for start in range(0, n_rows, block_size):
+        block = np.asarray(embeddings[start:start + block_size])
+        codes[start:start + len(block)] = np.packbits(block > 0, axis=1)
+    codes.flush()
+
+    logger.info(f'Binary index with {n_rows} codes saved to {binary_embeddings_path}')
+    return binary_embeddings_path
+
+
+class BinaryVectorIndex:
+    """
+    Two stage semantic search over sign-bit codes.
+
+    The packed codes are held in memory and ranked by Hamming distance to the
+    query's sign bits. The closest `n_candidates` rows are then rescored with
+    the original float vectors read from the embeddings memmap.
+    """
+
+    def __init__(
+        self,
+        codes_path: Path = binary_embeddings_path,
+        vectors_path: Path = embeddings_path,
+        n_candidates: int = 1000,
+        block_size: int = 262144,
+    ):
+        self.codes = np.load(codes_path)
+        self.vectors = np.load(vectors_path, mmap_mode='r')
+        self.n_candidates = n_candidates
+        self.block_size = block_size
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def _hamming_shortlist(self, query_code: np.ndarray, n: int) -> np.ndarray:
+        """Rows with the n smallest Hamming distances to `query_code`, unordered."""
+        best_rows = np.empty(0, dtype=np.int64)
+        best_dist = np.empty(0, dtype=np.uint16)
+
+        for start in range(0, len(self), self.block_size):
+            block = self.codes[start:start + self.block_size]
+            dist = np.concatenate([best_dist, _popcount(np.bitwise_xor(block, query_code))])
+            rows = np.concatenate([best_rows, np.arange(start, start + len(block), dtype=np.int64)])
+            if len(dist) > n:
+                keep = np.argpartition(dist, n - 1)[:n]
+                dist, rows = dist[keep], rows[keep]
+            best_dist, best_rows = dist, rows
+
+        return best_rows
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top k rows for each query, shortlisted by Hamming distance and rescored exactly.
+
+        Args:
+            query_embeddings: Normalised query vectors of shape (n_queries, dim)
+            k: Number of rows to return per query
+
+        Returns:
+            List of (row indices, scores) per query, best first
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        query_codes = np.packbits(queries > 0, axis=1)
+        n_candidates = max(self.n_candidates, k)
+
+        results = []
+        for query, query_code in zip(queries, query_codes):
+            # Sorted rows read the memmap in file order
+            candidates = np.sort(self._hamming_shortlist(query_code, n_candidates))
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            results.append((candidates[top], scores[top]))
+
+        return results
+
+    def search(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k rows for a single query, best first."""
+        return self.search_batch(query_embedding[None, :], k)[0]
+
+
+def evaluate_recall(n_queries: int = 200, k: int = 100, seed: int = 0) -> dict:
+    """
+    Recall@k of the binary index against exact cosine search.
+
+    Stored chunk embeddings, sampled at random, are used as queries.
+
+    Args:
+        n_queries: Number of sampled queries
+        k: Cut-off for recall
+        seed: Random seed for the sample
+
+    Returns:
+        Dictionary with mean and minimum recall and the settings used
+    """
+    exact = LocalVectorIndex(embeddings_path, settings.local_vector_block_size)
+    binary = BinaryVectorIndex(binary_embeddings_path, embeddings_path, settings.binary_rescore_candidates)
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(exact), size=min(n_queries, len(exact)), replace=False))
+    queries = np.asarray(exact.embeddings[sample], dtype=np.float32)
+
+    recalls = []
+    for (exact_rows, _), (binary_rows, _) in zip(exact.search_batch(queries, k), binary.search_batch(queries, k)):
+        recalls.append(len(np.intersect1d(exact_rows, binary_rows)) / max(len(exact_rows), 1))
+
+    return {
+        'k': k,
+        'queries': len(recalls),
+        'rescore_candidates': settings.binary_rescore_candidates,
+        'mean_recall': float(np.mean(recalls)) if recalls else 0.0,
+        'min_recall': float(np.min(recalls)) if recalls else 0.0,
+        'code_bytes': int(binary.codes.nbytes),
+        'vector_bytes': int(exact.embeddings.nbytes),
+    }
+
+
+def _load_binary_vector_index() -> BinaryVectorIndex:
+    index = BinaryVectorIndex(binary_embeddings_path, embeddings_path, settings.binary_rescore_candidates)
+    logger.info(f'Binary vector index loaded with {len(index)} codes')
+    return index
+
+
+register_index_component('binary_vector_index', _load_binary_vector_index)
+
+
+def get_binary_vector_index(snapshot: Optional[IndexSnapshot] = None) -> BinaryVectorIndex:
+    """Return the binary index of the served index snapshot, or of `snapshot`, loading the codes on first use."""
+    return current_snapshot(snapshot).get('binary_vector_index')
+
+
+if settings.vector_backend == 'binary':
+    register_resource(
+        'binary_vector_index',
+        get_binary_vector_index,
+        warmup=lambda index: index.search(np.ones(settings.embedding_dimension, dtype=np.float32), 1),
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or evaluate the binary quantized vector index')
+    parser.add_argument('--build', action='store_true', help='Rebuild the codes from embeddings.npy')
+    parser.add_argument('--eval', action='store_true', help='Report recall@k against exact search')
+    parser.add_argument('--queries', type=int, default=200, help='Number of sampled queries')
+    parser.add_argument('--k', type=int, default=100, help='Recall cut-off')
+    args = parser.parse_args()
+
+    if args.build:
+        build_binary_index()
+    if args.eval or not args.build:
+        print(json.dumps(evaluate_recall(n_queries=args.queries, k=args.k), indent=2))
@@ -1,8 +1,12 @@
-import pickle
+import json
+from array import array
+import shutil
+import uuid
+from collections import Counter
 from pathlib import Path
-from typing import List, Dict, Any
-from rank_bm25 import BM25Okapi
+from typing import List, Dict, Any, Tuple, Optional
 import re
+import numpy as np
 import pandas as pd
 from app.config import settings
 from app.config import logger
@@ -10,58 +14,504 @@ from app.config import logger
 chunked_data_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
 keyword_retriever_path = Path(settings.keyword_retriever_dir) / settings.keyword_retriever_file
 
+# Version of the on-disk index layout, bumped whenever the set of arrays changes
+INDEX_FORMAT_VERSION = 2
+
+# Same floor for negative idf values as rank_bm25's BM25Okapi
+BM25_EPSILON = 0.25
+
+
 def preprocess_text_for_bm25(text: str) -> List[str]:
     """
     Preprocess text for BM25 by tokenizing and cleaning.
-    
+
     Args:
         text: Input text string
-        
+
     Returns:
         List of tokens
     """
     # Convert to lowercase
     text = text.lower()
-    
+
     # Remove special characters but keep alphanumeric and spaces
     text = re.sub(r'[^\w\s]', ' ', text)
-    
+
     # Split by whitespace and filter empty strings
     tokens = [token for token in text.split() if token and len(token) > 1]
-    
+
     return tokens
 
 
-def create_bm25_retriever() -> BM25Okapi:
+class BM25Builder:
     """
-    Create BM25 retriever from chunks and save to persistent storage.
-    
-    Args:
-        chunks: List of chunk contents
-        storage_path: Path to save the BM25 model
+    Accumulates documents one at a time into compact posting arrays.
+
+    Used to build an index from a stream of chunks without holding the
+    tokenized corpus in memory.
     """
+
+    def __init__(self):
+        self.term_index: Dict[str, int] = {}
+        self.term_ids = array('q')
+        self.doc_ids = array('i')
+        self.tfs = array('i')
+        self.doc_len = array('i')
+
+    def add(self, tokens: List[str]) -> None:
+        """Append one tokenized document."""
+        doc_id = len(self.doc_len)
+        for term, tf in Counter(tokens).items():
+            self.term_ids.append(self.term_index.setdefault(term, len(self.term_index)))
+            self.doc_ids.append(doc_id)
+            self.tfs.append(tf)
+        self.doc_len.append(len(tokens))
+
+    def build(self, k1: float, b: float) -> 'BM25Index':
+        """Arrange the postings term-major and return the index."""
+        term_ids = np.frombuffer(self.term_ids, dtype=np.int64) if self.term_ids else np.empty(0, dtype=np.int64)
+        order = np.argsort(term_ids, kind='stable')
+        indptr = np.zeros(len(self.term_index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self.term_index)), out=indptr[1:])
+
+        return BM25Index(
+            vocab=list(self.term_index),
+            indptr=indptr,
+            doc_ids=np.asarray(self.doc_ids, dtype=np.int32)[order],
+            tfs=np.asarray(self.tfs, dtype=np.int32)[order],
+            doc_len=np.asarray(self.doc_len, dtype=np.int32),
+            k1=k1,
+            b=b,
+            index_version=uuid.uuid4().hex,
+        )
+
+
+class BM25Index:
+    """
+    BM25 (Okapi) index stored as a CSR term -> postings matrix.
+
+    Every posting holds its precomputed BM25 term weight
+    idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)), so scoring a
+    query only touches the postings of its terms instead of the whole corpus.
+    Scores are identical to rank_bm25's BM25Okapi.get_scores.
+    """
+
+    def __init__(
+        self,
+        vocab: List[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+        k1: float,
+        b: float,
+        index_version: str,
+        weights: Optional[np.ndarray] = None,
+    ):
+        self.vocab = vocab
+        self.term_index = {term: i for i, term in enumerate(vocab)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.index_version = index_version
+
+        self.corpus_size = len(doc_len)
+        self.avgdl = float(doc_len.sum()) / self.corpus_size if self.corpus_size else 0.0
+        self.idf = self._compute_idf()
+        self.weights = weights if weights is not None else self._compute_weights()
+
+    @classmethod
+    def from_corpus(cls, corpus: List[List[str]], k1: float, b: float) -> 'BM25Index':
+        """
+        Build an index from tokenized documents.
+
+        Args:
+            corpus: List of token lists, one per document
+            k1: Term frequency saturation
+            b: Length normalisation strength
+
+        Returns:
+            BM25Index
+        """
+        builder = BM25Builder()
+        for tokens in corpus:
+            builder.add(tokens)
+
+        return builder.build(k1=k1, b=b)
+
+    def update(self, keep: np.ndarray, new_corpus: List[List[str]]) -> 'BM25Index':
+        """
+        Build a new index with some documents removed and new ones appended.
+
+        The postings of kept documents are reused as they are, only the new
+        documents are tokenized. Kept documents keep their relative order and
+        the new documents follow them, matching the updated chunk file.
+
+        Args:
+            keep: Boolean mask over the current documents
+            new_corpus: Token lists of the documents to append
+
+        Returns:
+            New BM25Index with a fresh version
+        """
+        keep = np.asarray(keep, dtype=bool)
+        n_kept = int(keep.sum())
+
+        # Postings of kept documents, with document ids renumbered
+        remap = np.full(self.corpus_size, -1, dtype=np.int64)
+        remap[keep] = np.arange(n_kept)
+        posting_terms = np.repeat(np.arange(len(self.vocab)), np.diff(self.indptr))
+        posting_docs = np.asarray(self.doc_ids)
+        kept_postings = keep[posting_docs]
+
+        # Postings of the new documents, extending the vocabulary
+        term_index = dict(self.term_index)
+        new_terms, new_docs, new_tfs = [], [], []
+        for doc_id, tokens in enumerate(new_corpus, n_kept):
+            for term, tf in Counter(tokens).items():
+                new_terms.append(term_index.setdefault(term, len(term_index)))
+                new_docs.append(doc_id)
+                new_tfs.append(tf)
+
+        term_ids = np.concatenate([posting_terms[kept_postings], np.asarray(new_terms, dtype=np.int64)])
+        doc_ids = np.concatenate([remap[posting_docs[kept_postings]], np.asarray(new_docs, dtype=np.int64)])
+        tfs = np.concatenate([np.asarray(self.tfs)[kept_postings], np.asarray(new_tfs, dtype=np.int32)])
+
+        # Drop terms that no longer occur, so idf matches a fresh build
+        counts = np.bincount(term_ids, minlength=len(term_index))
+        alive = counts > 0
+        vocab = [term for term, is_alive in zip(term_index, alive) if is_alive]
+        term_ids = (np.cumsum(alive) - 1)[term_ids]
+
+        order = np.lexsort((doc_ids, term_ids))
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(counts[alive], out=indptr[1:])
+
+        return BM25Index(
+            vocab=vocab,
+            indptr=indptr,
+            doc_ids=doc_ids[order].astype(np.int32),
+            tfs=tfs[order].astype(np.int32),
+            doc_len=np.concatenate([
+                np.asarray(self.doc_len)[keep],
+                np.asarray([len(tokens) for tokens in new_corpus], dtype=np.int32),
+            ]).astype(np.int32),
+            k1=self.k1,
+            b=self.b,
+            index_version=uuid.uuid4().hex,
+        )
+
+    def _compute_idf(self) -> np.ndarray:
+        """Okapi idf with negative values floored to epsilon * average idf."""
+        doc_freq = np.diff(self.indptr).astype(np.float64)
+        idf = np.log(self.corpus_size - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        if len(idf):
+            idf[idf < 0] = BM25_EPSILON * idf.mean()
+        return idf
+
+    def _compute_weights(self) -> np.ndarray:
+        """BM25 weight of every posting for the current k1 and b."""
+        posting_idf = np.repeat(self.idf, np.diff(self.indptr))
+        tf = np.asarray(self.tfs, dtype=np.float64)
+        length_norm = 1 - self.b + self.b * np.asarray(self.doc_len, dtype=np.float64)[self.doc_ids] / self.avgdl
+        weights = posting_idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return weights.astype(np.float32)
+
+    def _query_postings(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenate the postings of the query terms, weighted by query term count."""
+        counts = Counter(self.term_index[t] for t in tokens if t in self.term_index)
+        if not counts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        docs, weights = [], []
+        for term_id, count in counts.items():
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs.append(self.doc_ids[start:end])
+            weights.append(self.weights[start:end].astype(np.float64) * count)
+
+        return np.concatenate(docs), np.concatenate(weights)
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        """
+        Dense scores over the whole corpus, matching BM25Okapi.get_scores.
+
+        Args:
+            tokens: Query tokens
+
+        Returns:
+            Array of scores with one entry per document
+        """
+        docs, weights = self._query_postings(tokens)
+        return np.bincount(docs, weights=weights, minlength=self.corpus_size)
+
+    def top_k(self, tokens: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Highest scoring documents for a query.
+
+        Only documents containing at least one query term are scored, and the
+        top k are selected with a partial sort.
+
+        Args:
+            tokens: Query tokens
+            k: Number of documents to return
+
+        Returns:
+            Document indices and their scores, best first
+        """
+        docs, weights = self._query_postings(tokens)
+        if not len(docs):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        # Sum the weights of the postings that hit the same document
+        matched, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return matched[top].astype(np.int64), scores[top]
+
+    def top_k_batch(self, queries: List[List[str]], k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        `top_k` for several queries in one vectorized pass.
+
+        The postings of all queries are scored together, keyed by
+        (query, document), then split back per query.
+
+        Args:
+            queries: Token lists, one per query
+            k: Number of documents to return per query
+
+        Returns:
+            List of (document indices, scores) per query, best first
+        """
+        query_ids, docs, weights = [], [], []
+        for query_id, tokens in enumerate(queries):
+            query_docs, query_weights = self._query_postings(tokens)
+            query_ids.append(np.full(len(query_docs), query_id, dtype=np.int64))
+            docs.append(query_docs)
+            weights.append(query_weights)
+
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        if not queries or not sum(len(d) for d in docs):
+            return [empty for _ in queries]
+
+        # Sum posting weights per (query, document) pair
+        keys = np.concatenate(query_ids) * self.corpus_size + np.concatenate(docs).astype(np.int64)
+        matched, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        matched_queries, matched_docs = np.divmod(matched, self.corpus_size)
+
+        # Order by query, then by descending score, and keep the first k of each query
+        order = np.lexsort((-scores, matched_queries))
+        bounds = np.searchsorted(matched_queries[order], np.arange(len(queries) + 1))
+
+        results = []
+        for query_id in range(len(queries)):
+            top = order[bounds[query_id]:min(bounds[query_id + 1], bounds[query_id] + k)]
+            results.append((matched_docs[top], scores[top]))
+        return results
+
+    def save(self, path: Path = keyword_retriever_path) -> str:
+        """
+        Save the index as a directory of numpy arrays.
+
+        The directory is written next to the target and swapped in at the end,
+        so a running process never sees a half written index.
+
+        Args:
+            path: Directory to write the index to
+
+        Returns:
+            The version string of the written index
+        """
+        path = Path(path)
+        meta = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'index_version': self.index_version,
+            'corpus_size': self.corpus_size,
+            'k1': self.k1,
+            'b': self.b,
+        }
+
+        tmp_path = path.with_name(f'{path.name}.tmp-{self.index_version}')
+        tmp_path.mkdir(parents=True)
+        np.save(tmp_path / 'indptr.npy', np.asarray(self.indptr))
+        np.save(tmp_path / 'doc_ids.npy', np.asarray(self.doc_ids))
+        np.save(tmp_path / 'tfs.npy', np.asarray(self.tfs))
+        np.save(tmp_path / 'doc_len.npy', np.asarray(self.doc_len))
+        np.save(tmp_path / 'weights.npy', np.asarray(self.weights))
+        with open(tmp_path / 'vocab.json', 'w', encoding='utf-8') as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        # meta.json is written last and marks the directory as complete
+        with open(tmp_path / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap the new index in place of the old one
+        old_path = path.with_name(f'{path.name}.old-{self.index_version}')
+        if path.exists():
+            path.rename(old_path)
+        tmp_path.rename(path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        return self.index_version
+
+    @classmethod
+    def load(cls, path: Path = keyword_retriever_path) -> 'BM25Index':
+        """
+        Load an index written by `save`, memory-mapping its arrays.
+
+        Format 1 indexes (no stored weights) are still readable. Posting weights
+        are recomputed if they are missing or were built with a different
+        k1/b than the current settings.
+
+        Args:
+            path: Index directory
+
+        Returns:
+            BM25Index
+        """
+        path = Path(path)
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta['format_version'] not in (1, INDEX_FORMAT_VERSION):
+            raise ValueError(
+                f"Unsupported BM25 index format {meta['format_version']} at {path}, "
+                f"expected {INDEX_FORMAT_VERSION}. Rebuild it with create_bm25_retriever()."
+            )
+
+        with open(path / 'vocab.json', 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+
+        weights = None
+        same_params = meta['k1'] == settings.bm25_k1 and meta['b'] == settings.bm25_b
+        if (path / 'weights.npy').exists() and same_params:
+            weights = np.load(path / 'weights.npy', mmap_mode='r')
+
+        return cls(
+            vocab=vocab,
+            indptr=np.load(path / 'indptr.npy', mmap_mode='r'),
+            doc_ids=np.load(path / 'doc_ids.npy', mmap_mode='r'),
+            tfs=np.load(path / 'tfs.npy', mmap_mode='r'),
+            doc_len=np.load(path / 'doc_len.npy', mmap_mode='r'),
+            k1=settings.bm25_k1,
+            b=settings.bm25_b,
+            index_version=meta['index_version'],
+            weights=weights,
+        )
+
+
+def save_bm25_index(index: BM25Index, path: Path = keyword_retriever_path) -> str:
+    """Save a BM25 index to `path` and return its version."""
+    return index.save(path)
+
+
+def load_bm25_index(path: Path = keyword_retriever_path) -> BM25Index:
+    """Load the BM25 index stored at `path`."""
+    return BM25Index.load(path)
+
+
+def load_bm25_corpus() -> List[List[str]]:
+    """Tokenize every chunk in the chunk file for BM25."""
     # Get chunks from path
-    df = pd.read_json(chunks_path)
+    df = pd.read_json(chunked_data_path)
     chunks = df['content'].to_list()
 
     # Extract and preprocess text content from chunks
     corpus = []
-    
+
     for chunk in chunks:
         # Preprocess text for BM25
         tokens = preprocess_text_for_bm25(chunk)
         corpus.append(tokens)
-    
-    # Create BM25 retriever
-    bm25_retriever = BM25Okapi(
-        corpus, 
+
+    return corpus
+
+
+def create_bm25_retriever() -> str:
+    """
+    Create BM25 retriever from chunks and save to persistent storage.
+
+    Returns:
+        The version string of the written index
+    """
+    corpus = load_bm25_corpus()
+
+    # Create BM25 index
+    bm25_index = BM25Index.from_corpus(
+        corpus,
         k1=settings.bm25_k1,
-        b=settings.bm25_b  
+        b=settings.bm25_b
     )
-    
+
     # Save to persistent storage
-    with open(storage_path, 'wb') as f:
-        pickle.dump(bm25_retriever, f)
-    
-    logger.info(f"BM25 retriever saved to {storage_path}")
-    return
\ No newline at end of file
+    index_version = save_bm25_index(bm25_index, keyword_retriever_path)
+
+    logger.info(f"BM25 index {index_version} saved to {keyword_retriever_path}")
+    return index_version
+
+
+def check_rank_bm25_parity(
+    corpus: List[List[str]],
+    queries: List[str],
+    rtol: float = 1e-5,
+    atol: float = 1e-5,
+) -> Dict[str, Any]:
+    """
+    Compare BM25Index scores with rank_bm25's BM25Okapi on the same corpus.
+
+    Args:
+        corpus: Tokenized documents
+        queries: Raw query strings
+        rtol: Relative tolerance for np.allclose
+        atol: Absolute tolerance for np.allclose
+
+    Returns:
+        Dictionary with the largest absolute score difference, whether every
+        query's scores and top 100 documents match, and the failing queries
+    """
+    from rank_bm25 import BM25Okapi
+
+    reference = BM25Okapi(corpus, k1=settings.bm25_k1, b=settings.bm25_b, epsilon=BM25_EPSILON)
+    index = BM25Index.from_corpus(corpus, k1=settings.bm25_k1, b=settings.bm25_b)
+
+    max_abs_diff = 0.0
+    failed = []
+    for query in queries:
+        tokens = preprocess_text_for_bm25(query)
+        expected = reference.get_scores(tokens)
+        actual = index.get_scores(tokens)
+        max_abs_diff = max(max_abs_diff, float(np.abs(expected - actual).max(initial=0.0)))
+
+        # Top documents must agree on score; ties may come back in either order
+        top_docs, top_scores = index.top_k(tokens, 100)
+        scores_match = np.allclose(expected, actual, rtol=rtol, atol=atol)
+        top_match = np.allclose(expected[top_docs], top_scores, rtol=rtol, atol=atol)
+        expected_top = np.sort(expected)[::-1][:len(top_scores)]
+        ranking_match = np.allclose(expected_top, top_scores, rtol=rtol, atol=atol)
+
+        if not (scores_match and top_match and ranking_match):
+            failed.append(query)
+
+    return {'max_abs_diff': max_abs_diff, 'passed': not failed, 'failed_queries': failed}
+
+
+if __name__ == '__main__':
+    import sys
+
+    sample_queries = sys.argv[1:] or [
+        'data scientist remote',
+        'senior software engineer python',
+        'registered nurse',
+        'marketing manager new york',
+    ]
+    result = check_rank_bm25_parity(load_bm25_corpus(), sample_queries)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['passed'] else 1)
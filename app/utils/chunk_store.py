@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+from typing import List, Dict, Tuple, Union, Optional
+import numpy as np
+from app.config import settings
+from app.config import logger
+from app.utils.resources import register_resource
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot, register_index_component
+
+chunked_data_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
+
+
+def chunk_point_id(chunk_id: Union[str, int]) -> int:
+    """
+    Convert a chunk_id such as '1234_0' to the integer id used for its Qdrant point.
+
+    Args:
+        chunk_id: chunk_id from the chunk file, or an already converted point id
+
+    Returns:
+        Integer point id
+    """
+    return int(chunk_id)
+
+
+class ChunkStore:
+    """
+    Columnar, read-only view of the chunk file.
+
+    Rows are in chunk file order, which is also the BM25 document order and
+    the embeddings.npy row order. Job ids are stored once and referenced by
+    an integer code per chunk.
+    """
+
+    def __init__(self, contents: List[str], job_ids: List[str], chunk_ids: List[str]):
+        self.contents = contents
+        self.chunk_ids = chunk_ids
+
+        # Dictionary encode the job ids: one code per chunk, one string per job
+        unique_job_ids, job_codes = np.unique(np.asarray(job_ids, dtype=object), return_inverse=True)
+        self.job_id_values = unique_job_ids.tolist()
+        self.job_codes = job_codes.astype(np.int32)
+        self.code_by_job_id: Dict[str, int] = {job_id: code for code, job_id in enumerate(self.job_id_values)}
+
+        # Rows grouped by job code, the rows of job c are rows_by_job[job_offsets[c]:job_offsets[c + 1]]
+        self.rows_by_job = np.argsort(self.job_codes, kind='stable').astype(np.int32)
+        self.job_offsets = np.concatenate(([0], np.cumsum(np.bincount(self.job_codes, minlength=len(self.job_id_values)))))
+
+        self.row_by_point_id: Dict[int, int] = {
+            chunk_point_id(chunk_id): row for row, chunk_id in enumerate(chunk_ids)
+        }
+
+    @classmethod
+    def from_file(cls, path: Path = chunked_data_path) -> 'ChunkStore':
+        """Load the chunk file written by chunk_job_descriptions()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)
+
+        return cls(
+            contents=[chunk['content'] for chunk in chunks],
+            job_ids=[chunk['metadata']['job_id'] for chunk in chunks],
+            chunk_ids=[chunk['chunk_id'] for chunk in chunks],
+        )
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def job_id(self, row: int) -> str:
+        """Job id of the chunk at BM25/embedding row `row`."""
+        return self.job_id_values[self.job_codes[row]]
+
+    def job_ids(self, rows: np.ndarray) -> List[str]:
+        """Job ids of several rows at once."""
+        values = self.job_id_values
+        return [values[code] for code in self.job_codes[np.asarray(rows, dtype=np.int64)].tolist()]
+
+    def rows_for_job(self, job_id: str) -> np.ndarray:
+        """Rows of every chunk of a job, empty for unknown job ids."""
+        code = self.code_by_job_id.get(job_id)
+        if code is None:
+            return self.rows_by_job[:0]
+        return self.rows_by_job[self.job_offsets[code]:self.job_offsets[code + 1]]
+
+    def get(self, row: int) -> Tuple[str, str]:
+        """Content and job id of the chunk at row `row`."""
+        return self.contents[row], self.job_id(row)
+
+    def row_for_chunk_id(self, chunk_id: Union[str, int]) -> int:
+        """Row of a chunk given its chunk_id or Qdrant point id."""
+        return self.row_by_point_id[chunk_point_id(chunk_id)]
+
+    def find_row(self, chunk_id: Union[str, int]) -> Optional[int]:
+        """Row of a chunk given its chunk_id or Qdrant point id, None if the store doesn't know it."""
+        return self.row_by_point_id.get(chunk_point_id(chunk_id))
+
+    def get_by_chunk_id(self, chunk_id: Union[str, int]) -> Tuple[str, str]:
+        """Content and job id of a chunk given its chunk_id or Qdrant point id."""
+        return self.get(self.row_for_chunk_id(chunk_id))
+
+
+def _load_chunk_store() -> ChunkStore:
+    store = ChunkStore.from_file(chunked_data_path)
+    logger.info(f'Chunk store loaded with {len(store)} chunks')
+    return store
+
+
+register_index_component('chunk_store', _load_chunk_store)
+
+
+def get_chunk_store(snapshot: Optional[IndexSnapshot] = None) -> ChunkStore:
+    """Return the chunk store of the served index snapshot, or of `snapshot`, loading it on first use."""
+    return current_snapshot(snapshot).get('chunk_store')
+
+
+register_resource('chunk_store', get_chunk_store)
@@ -1,6 +1,7 @@
 import re
 import pandas as pd
 import json
+from pathlib import Path
 from app.config import settings
 from app.config import logger
 
@@ -35,4 +36,4 @@ def chunk_job_descriptions():
 
     # Flatten all chunks from all rows into a single list    
     all_chunks = [chunk for chunks_list in df['chunks'] for chunk in chunks_list]
-    save_chunks_to_json(all_chunks, chunk_path)    
\ No newline at end of file
+    save_chunks_to_json(all_chunks, chunked_data_path)    
\ No newline at end of file
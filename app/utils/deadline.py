@@ -0,0 +1,26 @@
+import time
+
+
+class Deadline:
+    """
+    Point in time by which a request has to be answered.
+
+    Args:
+        budget_ms: Milliseconds from now until the deadline
+    """
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.started = time.monotonic()
+        self.expires = self.started + budget_ms / 1000
+
+    def remaining(self, reserve_ms: float = 0.0) -> float:
+        """Seconds left, keeping `reserve_ms` for later stages, never negative."""
+        return max(0.0, self.expires - time.monotonic() - reserve_ms / 1000)
+
+    def allows(self, needed_ms: float) -> bool:
+        """Whether a stage that needs `needed_ms` can still finish in time."""
+        return self.remaining() * 1000 >= needed_ms
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
@@ -1,21 +1,109 @@
-from sentence_transformers import SentenceTransformer
-import torch
+import asyncio
+import threading
 from app.config import settings
+from app.config import logger
+from app.utils.batcher import MicroBatcher
+from app.utils.cache import LRUCache, normalize_query
+from app.utils.executors import model_executor, run_in_executor
+from app.utils.model_backend import load_embedder
+from app.utils.resources import register_resource
+from app.utils.metrics import observe_batch_size, observe_cache
 
-# Use GPU
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
+_embedder = None
+_embedder_lock = threading.Lock()
 
-# Load the model    
-embedder = SentenceTransformer(settings.embedding_model, device=device)
 
-def embed_function(text):
-    """
-    text: List[str] or str
-    returns: np.ndarray with shape (n_texts, 384)
-    """
-    return embedder.encode(
-        text,
+def get_embedder():
+    """Return the process-wide embedding model, loading it on first use."""
+    global _embedder
+
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                import torch
+
+                # Use GPU
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+                # Load the model with the configured inference backend
+                _embedder = load_embedder(device)
+                logger.info(f'Embedding model {settings.embedding_model} loaded on {_embedder.device}')
+    return _embedder
+
+
+def encode_texts(texts):
+    """Encode a list of texts in a single model call."""
+    observe_batch_size('embedder', 1 if isinstance(texts, str) else len(texts))
+    return get_embedder().encode(
+        texts,
         batch_size=settings.embedding_batch_size,
         convert_to_numpy=True,
         normalize_embeddings=True, 
     )
+
+
+# Concurrent single-query embeddings are merged into one forward pass
+embed_batcher = MicroBatcher(
+    encode_texts,
+    max_batch_size=settings.embedding_micro_batch_size,
+    max_wait_ms=settings.micro_batch_max_wait_ms,
+    name='embedding-batcher',
+)
+
+
+# Embeddings of normalised queries, so repeated queries skip the forward pass
+query_embedding_cache = LRUCache(
+    maxsize=settings.embedding_cache_size,
+    ttl=settings.embedding_cache_ttl,
+)
+
+
+def _query_cache_key(query: str):
+    return (settings.embedding_model, query)
+
+
+register_resource('embedder', get_embedder, warmup=lambda embedder: encode_texts(['warm up query']))
+
+
+def _cache_embedding(query: str, embedding):
+    # Cached arrays are shared between requests, so they must not be modified
+    embedding.flags.writeable = False
+    query_embedding_cache.set(_query_cache_key(query), embedding)
+    return embedding
+
+
+def embed_function(text):
+    """
+    text: List[str] or str
+    returns: np.ndarray with shape (n_texts, 384), or (384,) for a single string
+    """
+    if not isinstance(text, str):
+        return encode_texts(text)
+
+    query = normalize_query(text)
+    embedding = query_embedding_cache.get(_query_cache_key(query))
+    observe_cache('query_embedding', embedding is not None)
+    if embedding is not None:
+        return embedding
+
+    if settings.micro_batch_enabled:
+        embedding = embed_batcher([query])[0]
+    else:
+        embedding = encode_texts(query)
+    return _cache_embedding(query, embedding)
+
+
+async def embed_function_async(text: str):
+    """Embed a single query without blocking the event loop."""
+    query = normalize_query(text)
+    embedding = query_embedding_cache.get(_query_cache_key(query))
+    observe_cache('query_embedding', embedding is not None)
+    if embedding is not None:
+        return embedding
+
+    if settings.micro_batch_enabled:
+        embeddings = await asyncio.wrap_future(embed_batcher.submit([query]))
+        embedding = embeddings[0]
+    else:
+        embedding = await run_in_executor(model_executor, encode_texts, query)
+    return _cache_embedding(query, embedding)
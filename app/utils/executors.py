@@ -0,0 +1,33 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+from app.config import settings
+
+# Model inference (embedding, cross-encoder) runs on its own small pool so it
+# can't starve the keyword search or the event loop
+model_executor = ThreadPoolExecutor(
+    max_workers=settings.inference_executor_workers,
+    thread_name_prefix='model',
+)
+
+# CPU bound search work such as BM25 scoring
+search_executor = ThreadPoolExecutor(
+    max_workers=settings.search_executor_workers,
+    thread_name_prefix='search',
+)
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function on `executor` and await its result, in the caller's context."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables such as the request's stage timings over to the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    """Stop the executors, letting queued work finish."""
+    model_executor.shutdown(wait=True)
+    search_executor.shutdown(wait=True)
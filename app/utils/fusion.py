@@ -0,0 +1,68 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# A retriever's result as (ids, 1-based ranks), best first
+Ranking = Tuple[Sequence[Hashable], Sequence[int]]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Ranking],
+    k: float = 60,
+    weights: Optional[Sequence[float]] = None,
+    top_n: Optional[int] = None,
+) -> Tuple[List[Hashable], np.ndarray]:
+    """
+    Fuse rankings by weighted reciprocal rank fusion, as a full outer join.
+
+    Every id found by any retriever is scored by the sum of
+    weight / (k + rank) over the retrievers that found it, so an id found by
+    only one retriever is kept with that retriever's contribution alone.
+
+    Args:
+        rankings: One (ids, ranks) pair per retriever
+        k: RRF constant, lower values favour the top ranks more
+        weights: Weight of each retriever, 1 for all by default
+        top_n: Number of ids to return, all by default
+
+    Returns:
+        (ids, scores), best first. Ties keep the order in which ids were first seen
+    """
+    if weights is None:
+        weights = [1.0] * len(rankings)
+    if len(weights) != len(rankings):
+        raise ValueError(f'{len(weights)} weights given for {len(rankings)} rankings')
+
+    # Give every id a position in one score array, in order of first appearance
+    positions: Dict[Hashable, int] = {}
+    scores = np.zeros(sum(len(ids) for ids, _ in rankings), dtype=np.float64)
+    for (ids, ranks), weight in zip(rankings, weights):
+        if not len(ids):
+            continue
+        index = np.fromiter((positions.setdefault(i, len(positions)) for i in ids), dtype=np.int64, count=len(ids))
+        # Ids are unique within a ranking, so a fancy-indexed add never drops a duplicate
+        scores[index] += weight / (k + np.asarray(ranks, dtype=np.float64))
+
+    scores = scores[:len(positions)]
+    order = np.argsort(-scores, kind='stable')
+    if top_n is not None:
+        order = order[:top_n]
+
+    fused_ids = list(positions)
+    return [fused_ids[i] for i in order], scores[order]
+
+
+def merge_contents(ids: Sequence[Hashable], contents: Sequence[Dict[Hashable, List[str]]]) -> Dict[Hashable, List[str]]:
+    """
+    Union of the chunks every retriever matched for each id, without duplicates.
+
+    Args:
+        ids: Ids to merge the chunks of
+        contents: One {id: chunks} mapping per retriever
+
+    Returns:
+        {id: chunks}, in the order the retrievers and their chunks were given
+    """
+    return {
+        job_id: list(dict.fromkeys(chunk for content in contents for chunk in content.get(job_id, ())))
+        for job_id in ids
+    }
@@ -0,0 +1,68 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from app.config import logger
+
+# Loaders of the file-backed indexes, registered by the modules that define them
+_loaders: Dict[str, Callable[[], Any]] = {}
+
+
+def register_index_component(name: str, loader: Callable[[], Any]) -> None:
+    """Register how to load one of the indexes built by ingestion, e.g. the chunk store."""
+    _loaders[name] = loader
+
+
+class IndexSnapshot:
+    """
+    One consistent version of the chunk store, job store, keyword index and vector indexes.
+
+    Their rows refer to each other, so a request takes one snapshot and reads
+    every index from it. Components load on first use; a reload builds a
+    complete new snapshot and publishes it with a single assignment.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """Return a component, loading it on first use."""
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = _loaders[name]()
+                    self._components[name] = component
+        return component
+
+    def loaded(self) -> List[str]:
+        return list(self._components)
+
+
+_snapshot = IndexSnapshot()
+_reload_lock = threading.Lock()
+
+
+def current_snapshot(snapshot: Optional[IndexSnapshot] = None) -> IndexSnapshot:
+    """The snapshot being served, or `snapshot` if the caller already holds one."""
+    return snapshot if snapshot is not None else _snapshot
+
+
+def reload_index_snapshot() -> IndexSnapshot:
+    """
+    Reload every loaded index from disk, e.g. after an ingestion run.
+
+    The new snapshot is fully loaded before it replaces the current one, so
+    requests in flight finish on the old version and never mix the two.
+    """
+    global _snapshot
+
+    with _reload_lock:
+        snapshot = IndexSnapshot()
+        # The keyword index carries the version, and the stores are needed by every query
+        for name in dict.fromkeys(['keyword_index', 'chunk_store', 'job_store', *_snapshot.loaded()]):
+            snapshot.get(name)
+        _snapshot = snapshot
+
+    logger.info(f'Index snapshot reloaded with {", ".join(snapshot.loaded())}')
+    return snapshot
@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.config import logger
+from app.utils.resources import register_resource
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot, register_index_component
+
+processed_data_path = Path(settings.processed_data_dir) / settings.processed_file_name
+job_texts_path = Path(settings.processed_data_dir) / settings.job_texts_file_name
+
+
+def prepare_job_text(job: Dict[str, Any]) -> str:
+    """Prepare job text for cross-encoding by combining relevant fields."""
+    text_parts = []
+    
+    # Job title and category
+    if job.get('Job Title'):
+        text_parts.append(f"Title: {job['Job Title']}")
+    
+    if job.get('Job Category'):
+        text_parts.append(f"Category: {job['Job Category']}")
+    
+    # Company and location
+    if job.get('Company Name'):
+        text_parts.append(f"Company: {job['Company Name']}")
+    
+    if job.get('Job Location'):
+        location_info = job['Job Location']
+        location_parts = []
+        if location_info.get('cities'):
+            location_parts.extend(location_info['cities'])
+        if location_info.get('states'):
+            location_parts.extend(location_info['states'])
+        if location_info.get('countries'):
+            location_parts.extend(location_info['countries'])
+        if location_parts:
+            text_parts.append(f"Location: {', '.join(location_parts)}")
+        if location_info.get('is_remote'):
+            text_parts.append("Remote: Yes")
+    
+    # Job level and description
+    if job.get('Job Level'):
+        text_parts.append(f"Level: {job['Job Level']}")
+    
+    if job.get('Job Description'):
+        # Clean and truncate description
+        description = job['Job Description'].replace('\n', ' ').replace('**', '').strip()
+        text_parts.append(f"Description: {description}")
+    
+    # Tags
+    if job.get('Tags') and job['Tags'] != ['nan']:
+        tags = [tag for tag in job['Tags'] if tag != 'nan']
+        if tags:
+            text_parts.append(f"Tags: {', '.join(tags)}")
+    
+    return " | ".join(text_parts)
+
+
+def build_job_store() -> Dict[str, str]:
+    """
+    Precompute the cross-encoder text of every processed job and save it next to processed.json.
+
+    Returns:
+        Dictionary of job ID to prepared job text
+    """
+    with open(processed_data_path, 'r', encoding='utf-8') as f:
+        processed_data = json.load(f)
+
+    job_texts = {job['ID']: prepare_job_text(job) for job in processed_data}
+
+    with open(job_texts_path, 'w', encoding='utf-8') as f:
+        json.dump(job_texts, f, ensure_ascii=False)
+
+    logger.info(f'Job texts saved to {job_texts_path}')
+    return job_texts
+
+
+class JobStore:
+    """Processed jobs and their prepared cross-encoder texts, keyed by job ID."""
+
+    def __init__(self, jobs: Dict[str, Dict[str, Any]], texts: Dict[str, str]):
+        self.jobs = jobs
+        self.texts = texts
+
+    @classmethod
+    def from_files(cls) -> 'JobStore':
+        """Load processed.json and the precomputed job texts."""
+        with open(processed_data_path, 'r', encoding='utf-8') as f:
+            jobs = {job['ID']: job for job in json.load(f)}
+
+        texts = {}
+        if job_texts_path.exists():
+            with open(job_texts_path, 'r', encoding='utf-8') as f:
+                texts = json.load(f)
+
+        # Fill in anything the ingestion run did not precompute
+        missing = [job_id for job_id in jobs if job_id not in texts]
+        if missing:
+            logger.info(f'Preparing texts for {len(missing)} jobs missing from {job_texts_path}')
+            for job_id in missing:
+                texts[job_id] = prepare_job_text(jobs[job_id])
+
+        return cls(jobs, texts)
+
+    def get_jobs(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Copies of the jobs with the given IDs, in the order of `job_ids`.
+
+        Unknown IDs are skipped. Copies are returned so callers can modify
+        them without touching the shared store.
+        """
+        return [dict(self.jobs[job_id]) for job_id in job_ids if job_id in self.jobs]
+
+    def get_texts(self, job_ids: List[str]) -> List[str]:
+        """Prepared cross-encoder texts for the given IDs, skipping unknown IDs."""
+        return [self.texts[job_id] for job_id in job_ids if job_id in self.jobs]
+
+
+def _load_job_store() -> JobStore:
+    store = JobStore.from_files()
+    logger.info(f'Job store loaded with {len(store.jobs)} jobs')
+    return store
+
+
+register_index_component('job_store', _load_job_store)
+
+
+def get_job_store(snapshot: Optional[IndexSnapshot] = None) -> JobStore:
+    """Return the job store of the served index snapshot, or of `snapshot`, loading it on first use."""
+    return current_snapshot(snapshot).get('job_store')
+
+
+register_resource('job_store', get_job_store)
@@ -0,0 +1,39 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+
+class JsonArrayWriter:
+    """Writes a JSON array one item at a time, swapping the file in on close."""
+
+    opening, closing = '[', ']'
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(f'{self.path.name}.tmp')
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.file.write(self.opening)
+        self.count = 0
+
+    def _write(self, text: str) -> None:
+        self.file.write(',\n' if self.count else '\n')
+        self.file.write(text)
+        self.count += 1
+
+    def write(self, item: Any) -> None:
+        self._write(json.dumps(item, ensure_ascii=False))
+
+    def close(self) -> None:
+        self.file.write(f'\n{self.closing}')
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class JsonObjectWriter(JsonArrayWriter):
+    """Writes a JSON object one key at a time, swapping the file in on close."""
+
+    opening, closing = '{', '}'
+
+    def write_item(self, key: str, value: Any) -> None:
+        self._write(f'{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}')
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.config import logger
+from app.utils.resources import register_resource
+from app.utils.index_snapshot import IndexSnapshot, current_snapshot, register_index_component
+
+embeddings_path = Path(settings.embeddings_data_dir) / settings.embeddings_file_name
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine search over the normalised embeddings.npy memmap.
+
+    Rows are scored a block at a time with a matrix product, and only the
+    running top k of each query is kept between blocks, so memory use is
+    bounded by the block size rather than the corpus size.
+    """
+
+    def __init__(self, path: Path = embeddings_path, block_size: int = 65536):
+        self.path = Path(path)
+        self.block_size = block_size
+        self.embeddings = np.load(self.path, mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top k rows for each query by inner product.
+
+        Args:
+            query_embeddings: Normalised query vectors of shape (n_queries, dim)
+            k: Number of rows to return per query
+
+        Returns:
+            List of (row indices, scores) per query, best first
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        n_queries = queries.shape[0]
+        best_rows = [np.empty(0, dtype=np.int64) for _ in range(n_queries)]
+        best_scores = [np.empty(0, dtype=np.float32) for _ in range(n_queries)]
+
+        for start in range(0, len(self), self.block_size):
+            block = np.asarray(self.embeddings[start:start + self.block_size], dtype=np.float32)
+            block_scores = block @ queries.T
+
+            for q in range(n_queries):
+                scores = np.concatenate([best_scores[q], block_scores[:, q]])
+                rows = np.concatenate([best_rows[q], np.arange(start, start + len(block), dtype=np.int64)])
+                if len(scores) > k:
+                    keep = np.argpartition(-scores, k - 1)[:k]
+                    scores, rows = scores[keep], rows[keep]
+                best_scores[q], best_rows[q] = scores, rows
+
+        results = []
+        for rows, scores in zip(best_rows, best_scores):
+            order = np.argsort(-scores, kind='stable')
+            results.append((rows[order], scores[order]))
+        return results
+
+    def search(self, query_embedding: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k rows for a single query, best first."""
+        return self.search_batch(query_embedding[None, :], k)[0]
+
+
+def _load_local_vector_index() -> LocalVectorIndex:
+    index = LocalVectorIndex(embeddings_path, settings.local_vector_block_size)
+    logger.info(f'Local vector index loaded with {len(index)} vectors')
+    return index
+
+
+register_index_component('local_vector_index', _load_local_vector_index)
+
+
+def get_local_vector_index(snapshot: Optional[IndexSnapshot] = None) -> LocalVectorIndex:
+    """Return the local vector index of the served index snapshot, or of `snapshot`, memory-mapping it on first use."""
+    return current_snapshot(snapshot).get('local_vector_index')
+
+
+if settings.vector_backend == 'local':
+    # A dummy search reads every block once, so the first query finds the vectors in the page cache
+    register_resource(
+        'local_vector_index',
+        get_local_vector_index,
+        warmup=lambda index: index.search(np.zeros(settings.embedding_dimension, dtype=np.float32), 1),
+    )
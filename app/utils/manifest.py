@@ -0,0 +1,77 @@
+import hashlib
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+import pandas as pd
+from app.config import settings
+
+manifest_path = Path(settings.data_dir) / settings.manifest_file_name
+
+
+def _normalize_value(value: Any) -> Any:
+    """
+    Map a cell to the same value however the sheet was read.
+
+    pd.read_excel turns integer columns with gaps into floats, while streaming
+    reads keep the integers, so integral floats are hashed as integers.
+    """
+    if isinstance(value, float) and not math.isnan(value) and value.is_integer():
+        return int(value)
+    return value
+
+
+def job_content_hash(job: Dict[str, Any]) -> str:
+    """Stable hash of a raw job row, used to detect changed jobs between ingestion runs."""
+    job = {key: _normalize_value(value) for key, value in job.items()}
+    payload = json.dumps(job, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compute_job_hashes(df: pd.DataFrame) -> Dict[str, str]:
+    """Content hash of every raw job row, keyed by job ID."""
+    return {str(job['ID']): job_content_hash(job) for job in df.to_dict(orient='records')}
+
+
+def load_manifest() -> Optional[Dict[str, Any]]:
+    """Return the manifest of the last ingestion run, or None if there is none."""
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def invalidate_manifest() -> None:
+    """Remove the manifest, so the next run rebuilds everything unless this one completes."""
+    if manifest_path.exists():
+        os.remove(manifest_path)
+
+
+def save_manifest(job_hashes: Dict[str, str], index_version: str, chunk_count: int) -> Dict[str, Any]:
+    """
+    Record the ingested jobs and the version of the indexes built from them.
+
+    Args:
+        job_hashes: Content hash per job ID
+        index_version: Version of the keyword index written by this run
+        chunk_count: Number of chunks in the chunk file
+
+    Returns:
+        The written manifest
+    """
+    manifest = {
+        'index_version': index_version,
+        'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'job_count': len(job_hashes),
+        'chunk_count': chunk_count,
+        'jobs': job_hashes,
+    }
+
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+    return manifest
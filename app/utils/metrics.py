@@ -0,0 +1,142 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    push_to_gateway,
+    REGISTRY,
+)
+from app.config import settings
+from app.config import logger
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+STAGE_DURATION = Histogram(
+    'rag_stage_duration_seconds', 'Duration of a query pipeline stage', ['stage'], buckets=LATENCY_BUCKETS,
+)
+STAGE_CANDIDATES = Histogram(
+    'rag_stage_candidates', 'Number of candidates a query pipeline stage returned', ['stage'], buckets=COUNT_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'rag_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'],
+)
+MODEL_BATCH_SIZE = Histogram(
+    'rag_model_batch_size', 'Number of inputs per model call', ['model'], buckets=COUNT_BUCKETS,
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    'rag_external_call_duration_seconds', 'Duration of calls to Qdrant and the LLM', ['service', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'rag_requests_in_flight', 'Requests being processed', ['endpoint'], multiprocess_mode='livesum',
+)
+SKIPPED_STAGES = Counter(
+    'rag_skipped_stages_total', 'Pipeline stages skipped to meet the latency budget', ['stage'],
+)
+INGESTION_STEP_DURATION = Histogram(
+    'rag_ingestion_step_duration_seconds', 'Duration of an ingestion step', ['step'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200),
+)
+
+# Stage timings of the current request, read by the timing header middleware
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('request_timings', default=None)
+
+
+def _record_timing(name: str, seconds: float) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Time a query pipeline stage into its histogram and the request's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.labels(stage).observe(elapsed)
+        _record_timing(stage, elapsed)
+
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Iterator[None]:
+    """Time a call to Qdrant or the LLM."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        EXTERNAL_CALL_DURATION.labels(service, operation).observe(elapsed)
+        _record_timing(service, elapsed)
+
+
+@contextmanager
+def track_ingestion_step(step: str) -> Iterator[None]:
+    """Time an ingestion step into its histogram and the log."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        INGESTION_STEP_DURATION.labels(step).observe(elapsed)
+        logger.info(f'Ingestion step {step} took {elapsed:.1f}s')
+
+
+def observe_candidates(stage: str, count: int) -> None:
+    STAGE_CANDIDATES.labels(stage).observe(count)
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def observe_skipped(stage: str) -> None:
+    SKIPPED_STAGES.labels(stage).inc()
+
+
+def observe_batch_size(model: str, size: int) -> None:
+    MODEL_BATCH_SIZE.labels(model).observe(size)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header, which browsers' devtools display."""
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.items())
+
+
+def render_metrics():
+    """
+    Current metrics in the Prometheus text format.
+
+    With several worker processes, set PROMETHEUS_MULTIPROC_DIR so the
+    metrics of every worker are aggregated.
+
+    Returns:
+        (body, content type)
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def push_ingestion_metrics() -> None:
+    """Push the ingestion step durations to a Pushgateway, as ingestion runs as a batch job."""
+    if not settings.metrics_pushgateway_url:
+        return
+    try:
+        push_to_gateway(settings.metrics_pushgateway_url, job='rag_ingestion', registry=REGISTRY)
+    except Exception as e:
+        logger.warning(f'Pushing ingestion metrics to {settings.metrics_pushgateway_url} failed: {e}')
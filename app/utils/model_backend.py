@@ -0,0 +1,202 @@
+import argparse
+import json
+import random
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+from app.config import settings
+from app.config import logger
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+models_dir = Path(settings.data_dir) / 'models'
+
+
+def _session_options(threads: Optional[int]):
+    """ONNX Runtime session options limiting the intra-op threads of one worker."""
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            'INFERENCE_BACKEND=onnx requires ONNX Runtime: pip install "sentence-transformers[onnx]"'
+        ) from e
+
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _quantized_file_name() -> str:
+    return f'onnx/model_qint8_{settings.onnx_quantization_config}.onnx'
+
+
+def _export_dir(model_name: str) -> Path:
+    return models_dir / re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+
+
+def _load(model_cls, model_name: str, backend: str, threads: Optional[int], **kwargs):
+    """
+    Load a SentenceTransformer or CrossEncoder with the given inference backend.
+
+    `onnx` exports the model to ONNX on first use. `onnx-int8` additionally
+    applies dynamic int8 quantisation once and keeps the quantised graph in
+    DATA_DIR/models, so later loads skip the export.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown inference backend: {backend}, expected one of {BACKENDS}')
+
+    if backend == 'torch':
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        return model_cls(model_name, **kwargs)
+
+    # The ONNX graphs are optimised for CPU
+    kwargs['device'] = 'cpu'
+    model_kwargs = {'provider': 'CPUExecutionProvider', 'session_options': _session_options(threads)}
+
+    if backend == 'onnx':
+        return model_cls(model_name, backend='onnx', model_kwargs=model_kwargs, **kwargs)
+
+    export_dir = _export_dir(model_name)
+    if not (export_dir / _quantized_file_name()).exists():
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info(f'Exporting {model_name} to int8 ONNX in {export_dir}')
+        model = model_cls(model_name, backend='onnx', **kwargs)
+        model.save_pretrained(str(export_dir))
+        export_dynamic_quantized_onnx_model(
+            model,
+            quantization_config=settings.onnx_quantization_config,
+            model_name_or_path=str(export_dir),
+        )
+
+    model_kwargs['file_name'] = _quantized_file_name()
+    return model_cls(str(export_dir), backend='onnx', model_kwargs=model_kwargs, **kwargs)
+
+
+def load_embedder(device: str = 'cpu', backend: Optional[str] = None, threads: Optional[int] = None):
+    """
+    Load the embedding model with the configured inference backend.
+
+    Args:
+        device: Device of the torch backend, ONNX backends always run on CPU
+        backend: Overrides INFERENCE_BACKEND
+        threads: Overrides INFERENCE_THREADS
+
+    Returns:
+        SentenceTransformer
+    """
+    from sentence_transformers import SentenceTransformer
+
+    return _load(
+        SentenceTransformer,
+        settings.embedding_model,
+        backend or settings.inference_backend,
+        threads or settings.inference_threads,
+        device=device,
+    )
+
+
+def load_cross_encoder(backend: Optional[str] = None, threads: Optional[int] = None):
+    """
+    Load the reranker model with the configured inference backend.
+
+    Args:
+        backend: Overrides INFERENCE_BACKEND
+        threads: Overrides INFERENCE_THREADS
+
+    Returns:
+        CrossEncoder
+    """
+    from sentence_transformers import CrossEncoder
+
+    return _load(
+        CrossEncoder,
+        settings.reranker_model,
+        backend or settings.inference_backend,
+        threads or settings.inference_threads,
+    )
+
+
+def check_backend_accuracy(backend: Optional[str] = None, n_samples: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Compare the outputs of an inference backend to the PyTorch models.
+
+    Embeddings are compared by cosine similarity to the PyTorch embedding of
+    the same text. Cross-encoder scores are compared by absolute difference,
+    and by how often both backends agree on the order of two candidates of
+    the same query.
+
+    Args:
+        backend: Backend to check, defaults to INFERENCE_BACKEND
+        n_samples: Number of chunks and (query, job) pairs to compare
+        seed: Random seed of the sample
+
+    Returns:
+        Accuracy report
+    """
+    from app.utils.chunk_store import get_chunk_store
+    from app.utils.job_store import get_job_store
+
+    backend = backend or settings.inference_backend
+    rng = random.Random(seed)
+
+    contents = get_chunk_store().contents
+    texts = rng.sample(contents, min(n_samples, len(contents)))
+
+    # Queries are short spans of chunk text, each paired with a few jobs
+    job_store = get_job_store()
+    job_ids = list(job_store.texts)
+    queries = [' '.join(text.split()[:6]) for text in texts[:max(1, n_samples // 5)]]
+    pairs = [
+        (query, job_text)
+        for query in queries
+        for job_text in job_store.get_texts(rng.sample(job_ids, min(5, len(job_ids))))
+    ]
+
+    reference = load_embedder(backend='torch').encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    candidate = load_embedder(backend=backend).encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    cosine = np.sum(reference * candidate, axis=1)
+
+    reference_scores = np.asarray(load_cross_encoder(backend='torch').predict(pairs))
+    candidate_scores = np.asarray(load_cross_encoder(backend=backend).predict(pairs))
+    score_diff = np.abs(reference_scores - candidate_scores)
+
+    # Pairwise order agreement within each query's candidates
+    agree, total = 0, 0
+    group = len(pairs) // len(queries)
+    for start in range(0, len(pairs), group):
+        ref, cand = reference_scores[start:start + group], candidate_scores[start:start + group]
+        for i in range(len(ref)):
+            for j in range(i + 1, len(ref)):
+                agree += (ref[i] > ref[j]) == (cand[i] > cand[j])
+                total += 1
+
+    return {
+        'backend': backend,
+        'embedding': {
+            'samples': len(texts),
+            'mean_cosine': float(cosine.mean()),
+            'min_cosine': float(cosine.min()),
+        },
+        'cross_encoder': {
+            'pairs': len(pairs),
+            'mean_abs_diff': float(score_diff.mean()),
+            'max_abs_diff': float(score_diff.max()),
+            'pairwise_order_agreement': agree / total if total else 1.0,
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare an inference backend to the PyTorch models')
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='Backend to check, defaults to INFERENCE_BACKEND')
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(check_backend_accuracy(args.backend, args.samples), indent=2))
@@ -0,0 +1,218 @@
+import argparse
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.config import logger
+
+
+class Resource:
+    """
+    A process-wide resource, loaded on first use by its getter.
+
+    The getter is the module's own lazy singleton accessor such as
+    get_chunk_store(), so requests and the warm-up share one instance.
+    The optional warm-up function runs a dummy inference on the loaded
+    resource, paying one-time costs before the first request does.
+    """
+
+    def __init__(self, name: str, getter: Callable[[], Any], warmup: Optional[Callable[[Any], Any]] = None):
+        self.name = name
+        self.getter = getter
+        self.warmup = warmup
+        self.state = 'cold'
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+
+    def warm_up(self) -> None:
+        """Load the resource and run its warm-up."""
+        self.state = 'loading'
+        self.attempts += 1
+        try:
+            started = time.perf_counter()
+            value = self.getter()
+            self.load_seconds = time.perf_counter() - started
+
+            if self.warmup is not None:
+                started = time.perf_counter()
+                self.warmup(value)
+                self.warmup_seconds = time.perf_counter() - started
+        except Exception as e:
+            self.state, self.error = 'failed', f'{type(e).__name__}: {e}'
+            raise
+        self.state = 'ready'
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'error': self.error,
+            'attempts': self.attempts,
+        }
+
+
+class ResourceRegistry:
+    """
+    Registry of the lazily loaded resources a worker needs to serve queries.
+
+    Modules register their heavy resources at import time, which only
+    records the getter. `warm_up` then loads every resource in parallel, and
+    the worker is ready once all of them are.
+    """
+
+    def __init__(self):
+        self.resources: Dict[str, Resource] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, getter: Callable[[], Any], warmup: Optional[Callable[[Any], Any]] = None) -> Resource:
+        resource = Resource(name, getter, warmup)
+        with self._lock:
+            self.resources[name] = resource
+        return resource
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.resources) and all(r.state == 'ready' for r in self.resources.values())
+
+    def warm_up(self, max_workers: Optional[int] = None, retry: bool = False) -> bool:
+        """
+        Load and warm every registered resource in parallel.
+
+        Models, indexes and clients load in separate threads, as most of
+        their load time is spent in file reads and native code.
+
+        Args:
+            max_workers: Number of resources loading at once
+            retry: Retry failed resources with exponential backoff until they
+                are ready, e.g. while Qdrant is still unreachable as the pod
+                boots. Without it a failed resource stays failed
+
+        Returns:
+            Whether every resource is ready
+        """
+        self.started_at = time.perf_counter()
+        resources = list(self.resources.values())
+
+        def warm(resource: Resource) -> None:
+            try:
+                resource.warm_up()
+                logger.info(
+                    f'{resource.name} ready: loaded in {resource.load_seconds:.2f}s'
+                    + (f', warmed up in {resource.warmup_seconds:.2f}s' if resource.warmup_seconds is not None else '')
+                )
+            except Exception:
+                logger.exception(f'Warm-up of {resource.name} failed (attempt {resource.attempts})')
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or settings.warmup_workers,
+            thread_name_prefix='warmup',
+        ) as pool:
+            list(pool.map(warm, resources))
+
+        self.finished_at = time.perf_counter()
+        logger.info(f'Warm-up finished in {self.finished_at - self.started_at:.2f}s, ready: {self.ready}')
+
+        # Retry what failed after the first pass, so a resource that keeps failing never holds a pool slot
+        delay = settings.warmup_retry_initial_seconds
+        failed = [resource for resource in resources if resource.state == 'failed']
+        while retry and failed:
+            logger.info(f'Retrying warm-up of {", ".join(r.name for r in failed)} in {delay:.0f}s')
+            time.sleep(delay)
+            for resource in failed:
+                warm(resource)
+            delay = min(delay * 2, settings.warmup_retry_max_seconds)
+            failed = [resource for resource in failed if resource.state == 'failed']
+            if not failed:
+                self.finished_at = time.perf_counter()
+                logger.info(f'Worker ready after {self.finished_at - self.started_at:.2f}s')
+
+        return self.ready
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness of the worker and of each resource."""
+        warmup_seconds = None
+        if self.started_at is not None and self.finished_at is not None:
+            warmup_seconds = self.finished_at - self.started_at
+        return {
+            'ready': self.ready,
+            'warmup_seconds': warmup_seconds,
+            'resources': {name: resource.status() for name, resource in self.resources.items()},
+        }
+
+
+registry = ResourceRegistry()
+
+
+def register_resource(name: str, getter: Callable[[], Any], warmup: Optional[Callable[[Any], Any]] = None) -> Resource:
+    """Register a lazily loaded resource with the process-wide registry."""
+    return registry.register(name, getter, warmup)
+
+
+def profile_imports(module: str = 'app.main', top: int = 20) -> List[Dict[str, Any]]:
+    """
+    Measure the import time of a module and everything it imports.
+
+    Runs `python -X importtime` in a fresh interpreter, so nothing is cached.
+
+    Args:
+        module: Module to import
+        top: Number of modules to report
+
+    Returns:
+        The slowest modules by cumulative import time, in milliseconds
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr[-2000:]}')
+
+    pattern = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+    entries = []
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2,
+            })
+
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return entries[:top]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report import and warm-up times of the API')
+    parser.add_argument('--module', default='app.main', help='Module to profile the import of')
+    parser.add_argument('--top', type=int, default=20, help='Number of modules to report')
+    parser.add_argument('--warmup', action='store_true', help='Also import the module and warm up its resources')
+    args = parser.parse_args()
+
+    print(f'{"cumulative ms":>14} {"self ms":>10}  module')
+    for entry in profile_imports(args.module, args.top):
+        print(f'{entry["cumulative_ms"]:>14.1f} {entry["self_ms"]:>10.1f}  {"  " * entry["depth"]}{entry["module"]}')
+
+    if args.warmup:
+        import importlib
+
+        importlib.import_module(args.module)
+        registry.warm_up()
+        print(f'\n{"load s":>10} {"warm-up s":>10}  resource')
+        for name, status in registry.status()['resources'].items():
+            load = f'{status["load_seconds"]:.2f}' if status['load_seconds'] is not None else '-'
+            warm = f'{status["warmup_seconds"]:.2f}' if status['warmup_seconds'] is not None else '-'
+            print(f'{load:>10} {warm:>10}  {name}  {status["error"] or ""}')
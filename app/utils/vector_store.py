@@ -1,12 +1,23 @@
-from qdrant_client import QdrantClient
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from app.config import settings
+from app.config import logger
+from app.utils.chunk_store import chunk_point_id
+from app.utils.resources import register_resource
 from typing import List, Dict, Any
-import pandas as pd
 import numpy as np
 from qdrant_client.models import (
+    Batch,
     Distance,
+    OptimizersConfigDiff,
     VectorParams,
     PointStruct,
+    PointIdsList,
 )
 from pathlib import Path
 
@@ -14,46 +25,261 @@ chunks_path = Path(settings.chunked_data_dir) / settings.chunked_file_name
 embeddings_path = Path(settings.embeddings_data_dir) / settings.embeddings_file_name
 
 
-def get_qdrant_client():
-    qdrant_client = QdrantClient(
-        url=settings.vector_db_url,
-        api_key=settings.vector_db_api_key,
-        timeout=60.0
+_qdrant_client = None
+_async_qdrant_client = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> Dict[str, Any]:
+    """Connection options shared by the sync and async clients."""
+    options = {
+        'url': settings.vector_db_url,
+        'api_key': settings.vector_db_api_key,
+        'timeout': settings.vector_db_timeout,
+        'prefer_grpc': settings.vector_db_prefer_grpc,
+        'grpc_port': settings.vector_db_grpc_port,
+    }
+
+    if settings.vector_db_prefer_grpc:
+        keepalive_ms = int(settings.vector_db_keepalive_seconds * 1000)
+        options['grpc_options'] = {
+            'grpc.keepalive_time_ms': keepalive_ms,
+            'grpc.keepalive_timeout_ms': min(keepalive_ms, 10000),
+            'grpc.keepalive_permit_without_calls': 1,
+        }
+    else:
+        # Keep a bounded pool of warm HTTP connections instead of reconnecting per query
+        options['limits'] = httpx.Limits(
+            max_connections=settings.vector_db_pool_size,
+            max_keepalive_connections=settings.vector_db_pool_size,
+            keepalive_expiry=settings.vector_db_keepalive_seconds,
+        )
+
+    return options
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Return the process-wide Qdrant client, creating it on first use."""
+    global _qdrant_client
+
+    if _qdrant_client is None:
+        with _client_lock:
+            if _qdrant_client is None:
+                _qdrant_client = QdrantClient(**_client_options())
+    return _qdrant_client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Return the process-wide async Qdrant client, creating it on first use."""
+    global _async_qdrant_client
+
+    if _async_qdrant_client is None:
+        with _client_lock:
+            if _async_qdrant_client is None:
+                _async_qdrant_client = AsyncQdrantClient(**_client_options())
+    return _async_qdrant_client
+
+
+def check_qdrant_health() -> None:
+    """
+    Verify that Qdrant is reachable and the collection exists.
+
+    Raises:
+        RuntimeError: If Qdrant can't be reached or the collection is missing
+    """
+    client = get_qdrant_client()
+
+    try:
+        exists = client.collection_exists(collection_name=settings.vector_db_collection_name)
+    except Exception as e:
+        raise RuntimeError(f'Qdrant at {settings.vector_db_url} is not reachable: {e}') from e
+
+    if not exists:
+        raise RuntimeError(
+            f'Qdrant collection {settings.vector_db_collection_name} does not exist. '
+            'Run the ingestion pipeline first.'
+        )
+
+    logger.info(f'Qdrant collection {settings.vector_db_collection_name} is available')
+
+
+if settings.vector_backend == 'qdrant' and settings.vector_db_startup_check:
+    # Warming up opens the pooled connection and checks the collection
+    register_resource('qdrant', get_qdrant_client, warmup=lambda client: check_qdrant_health())
+
+
+async def close_qdrant_clients() -> None:
+    """Close the shared clients and their connection pools."""
+    global _qdrant_client, _async_qdrant_client
+
+    with _client_lock:
+        client, async_client = _qdrant_client, _async_qdrant_client
+        _qdrant_client, _async_qdrant_client = None, None
+
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
+
+
+def recreate_collection(client) -> None:
+    """
+    Create an empty collection with HNSW indexing deferred.
+
+    With an indexing threshold of 0 Qdrant only stores the uploaded points,
+    instead of rebuilding the graph while every batch arrives. Call
+    `enable_indexing` once the load is done.
+    """
+    client.recreate_collection(
+        collection_name=settings.vector_db_collection_name,
+        vectors_config=VectorParams(size=settings.vector_size, distance=Distance.COSINE),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
+    )
+
+
+def enable_indexing(client) -> None:
+    """Restore the indexing threshold, so Qdrant builds the index once over all points."""
+    client.update_collection(
+        collection_name=settings.vector_db_collection_name,
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=settings.vector_db_indexing_threshold),
     )
-    return qdrant_client
+
+
+def _upsert_with_retry(client, points) -> None:
+    """Upsert one batch, retrying with exponential backoff on failure."""
+    for attempt in range(settings.vector_upload_max_retries + 1):
+        try:
+            client.upsert(collection_name=settings.vector_db_collection_name, points=points)
+            return
+        except Exception as e:
+            if attempt == settings.vector_upload_max_retries:
+                raise
+            delay = min(2 ** attempt * 0.5, 30)
+            logger.warning(f'Upsert failed ({e}), retrying in {delay:.1f}s')
+            time.sleep(delay)
 
 
 def populate_vectordb(
     client,
-    batch_size: int = 100
+    batch_size: int = None,
+    parallel: int = None,
 ):
     """
     Populates a Qdrant collection with embeddings and metadata in batches.
+
+    Vectors are read from the memmapped embeddings file one batch at a time.
+    A producer thread builds the batches while `parallel` uploader threads
+    keep that many upsert requests in flight. Indexing is deferred during the
+    load and enabled at the end.
+
+    Args:
+        client: Qdrant client
+        batch_size: Points per upsert request, defaults to VECTOR_UPLOAD_BATCH_SIZE
+        parallel: Concurrent upsert requests, defaults to VECTOR_UPLOAD_PARALLEL
     """
+    batch_size = batch_size or settings.vector_upload_batch_size
+    parallel = parallel or settings.vector_upload_parallel
 
-    embeddings = np.load(embeddings_path).tolist()
-    chunks = pd.read_json(chunks_path)
-    ids = chunks['chunk_id'].to_list()
-    metadatas = chunks['metadata'].to_list()
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    with open(chunks_path, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+    ids = [chunk_point_id(chunk['chunk_id']) for chunk in chunks]
+    metadatas = [chunk['metadata'] for chunk in chunks]
+    del chunks
 
     # Create collection
-    client.recreate_collection(
-        collection_name=settings.vector_db_collection_name,
-        vectors_config=VectorParams(size=settings.vector_size, distance=Distance.COSINE),
-    )
+    recreate_collection(client)
 
     total = len(embeddings)
-    for start in range(0, total, batch_size):
-        end = min(start + batch_size, total)
+    batches = queue.Queue(maxsize=parallel * 2)
+    failed = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once an uploader failed, instead of blocking on a full queue
+        while not failed.is_set():
+            try:
+                batches.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    producer_errors = []
+
+    def produce():
+        try:
+            for start in range(0, total, batch_size):
+                end = min(start + batch_size, total)
+                batch = Batch(
+                    ids=ids[start:end],
+                    vectors=np.asarray(embeddings[start:end], dtype=np.float32).tolist(),
+                    payloads=metadatas[start:end],
+                )
+                if not put(batch):
+                    return
+        except BaseException as e:
+            producer_errors.append(e)
+            failed.set()
+        finally:
+            # One sentinel per uploader, after a failure they stop on `failed` instead
+            for _ in range(parallel):
+                put(None)
+
+    def upload() -> int:
+        uploaded = 0
+        while not failed.is_set():
+            try:
+                batch = batches.get(timeout=1)
+            except queue.Empty:
+                continue
+            if batch is None:
+                break
+            try:
+                _upsert_with_retry(client, batch)
+            except Exception:
+                failed.set()
+                raise
+            uploaded += len(batch.ids)
+        return uploaded
+
+    started = time.perf_counter()
+    producer = threading.Thread(target=produce, name='qdrant-batch-producer', daemon=True)
+    producer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='qdrant-upload') as pool:
+            uploads = [pool.submit(upload) for _ in range(parallel)]
+            uploaded = sum(future.result() for future in uploads)
+    finally:
+        producer.join()
+        # Leave the collection searchable even if the load failed part way
+        enable_indexing(client)
+    if producer_errors:
+        raise producer_errors[0]
+
+    logger.info(f'Uploaded {uploaded} points in {time.perf_counter() - started:.1f}s')
+
+
+def upsert_chunks(client, chunks: List[Dict[str, Any]], embeddings: np.ndarray, batch_size: int = 100):
+    """Insert or replace the points of the given chunks."""
+    for start in range(0, len(chunks), batch_size):
+        end = min(start + batch_size, len(chunks))
         batch_points = [
             PointStruct(
-                id=int(ids[i]),
-                vector=embeddings[i],
-                payload=metadatas[i],
+                id=chunk_point_id(chunks[i]['chunk_id']),
+                vector=np.asarray(embeddings[i], dtype=np.float32).tolist(),
+                payload=chunks[i]['metadata'],
             )
             for i in range(start, end)
         ]
-        client.upsert(
+        _upsert_with_retry(client, batch_points)
+
+
+def delete_chunk_points(client, chunk_ids: List[str], batch_size: int = 1000):
+    """Delete the points of the given chunks."""
+    for start in range(0, len(chunk_ids), batch_size):
+        client.delete(
             collection_name=settings.vector_db_collection_name,
-            points=batch_points,
-        )
\ No newline at end of file
+            points_selector=PointIdsList(
+                points=[chunk_point_id(chunk_id) for chunk_id in chunk_ids[start:start + batch_size]]
+            ),
+        )
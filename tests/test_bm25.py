@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+from app.utils.bm25 import BM25Index, BM25_EPSILON
+
+K1, B = 1.5, 0.75
+
+# "engineer" is in most documents, so its idf is negative and floored like in rank_bm25
+CORPUS = [
+    ['senior', 'python', 'engineer', 'remote'],
+    ['data', 'scientist', 'python', 'machine', 'learning', 'engineer'],
+    ['registered', 'nurse', 'night', 'shift'],
+    ['software', 'engineer', 'java', 'backend', 'engineer'],
+    ['marketing', 'manager', 'new', 'york'],
+    ['machine', 'learning', 'engineer', 'python', 'python'],
+    ['engineer', 'manager', 'remote'],
+]
+
+QUERIES = [
+    ['python', 'engineer'],
+    ['python', 'python', 'remote'],
+    ['engineer'],
+    ['machine', 'learning', 'engineer', 'engineer'],
+    ['nurse', 'unknown'],
+    ['unknown'],
+    [],
+]
+
+
+@pytest.fixture(scope='module')
+def indexes():
+    reference = BM25Okapi(CORPUS, k1=K1, b=B, epsilon=BM25_EPSILON)
+    index = BM25Index.from_corpus(CORPUS, k1=K1, b=B)
+    return reference, index
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_get_scores_match_rank_bm25(indexes, query):
+    reference, index = indexes
+    np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_top_k_matches_rank_bm25(indexes, query):
+    reference, index = indexes
+    expected = reference.get_scores(query)
+
+    docs, scores = index.top_k(query, 3)
+
+    np.testing.assert_allclose(scores, expected[docs], rtol=1e-6, atol=1e-9)
+    # Best first, and no better document left out; ties may come back in either order
+    np.testing.assert_allclose(scores, np.sort(expected[expected != 0])[::-1][:len(scores)], rtol=1e-6, atol=1e-9)
+
+
+def test_negative_idf_is_floored(indexes):
+    reference, index = indexes
+    floored = BM25_EPSILON * reference.average_idf
+
+    assert reference.idf['engineer'] == pytest.approx(floored)
+    assert index.get_scores(['engineer'])[0] > 0
+
+
+def test_update_matches_full_build():
+    base = BM25Index.from_corpus(CORPUS[:4], k1=K1, b=B)
+
+    # Document 1 is replaced: dropped in place, its new version appended before the new documents.
+    # "data" and "scientist" only occur in its old version, so they must leave the vocabulary
+    replacement = ['senior', 'machine', 'learning', 'engineer']
+    updated = base.update(np.array([True, False, True, True]), [replacement, *CORPUS[4:]])
+    expected = BM25Index.from_corpus([CORPUS[0], CORPUS[2], CORPUS[3], replacement, *CORPUS[4:]], k1=K1, b=B)
+
+    assert updated.corpus_size == expected.corpus_size
+    assert sorted(updated.vocab) == sorted(expected.vocab)
+    assert 'scientist' not in updated.vocab
+    for query in [*QUERIES, ['data', 'scientist'], replacement]:
+        expected_scores = expected.get_scores(query)
+        np.testing.assert_allclose(updated.get_scores(query), expected_scores, rtol=1e-6, atol=1e-9)
+
+        docs, scores = updated.top_k(query, 3)
+        np.testing.assert_allclose(scores, expected_scores[docs], rtol=1e-6, atol=1e-9)
+        np.testing.assert_allclose(scores, expected.top_k(query, 3)[1], rtol=1e-6, atol=1e-9)
@@ -0,0 +1,91 @@
+import time
+import pytest
+import app.services.result_cache as result_cache_module
+from app.services.result_cache import (
+    InMemoryCacheBackend,
+    LocalSharedClient,
+    ResultCache,
+    SharedCacheBackend,
+)
+
+JOB_IDS = ['J0001', 'J0002', 'J0003']
+
+
+@pytest.fixture
+def index_version(monkeypatch):
+    # The cache keys on the served keyword index version, which tests set directly
+    version = {'current': 'v1'}
+    monkeypatch.setattr(result_cache_module, 'current_index_version', lambda: version['current'])
+    return version
+
+
+@pytest.fixture(params=['memory', 'local'])
+def cache(request, index_version):
+    if request.param == 'memory':
+        return ResultCache(
+            answer_backend=InMemoryCacheBackend(maxsize=16),
+            llm_backend=InMemoryCacheBackend(maxsize=16),
+        )
+    client = LocalSharedClient(maxsize=32)
+    return ResultCache(
+        answer_backend=SharedCacheBackend(client, 'answer'),
+        llm_backend=SharedCacheBackend(client, 'llm'),
+    )
+
+
+def test_answer_hit_and_miss(cache):
+    assert cache.get_answer('remote python developer') is None
+
+    cache.set_answer('remote python developer', 'answer')
+
+    # Queries that only differ in case and whitespace share the entry
+    assert cache.get_answer('  Remote  Python developer ') == 'answer'
+    assert cache.get_answer('remote java developer') is None
+    assert cache.stats() == {'hits': {'answer': 1, 'llm': 0}, 'misses': {'answer': 2, 'llm': 0}}
+
+
+def test_llm_hit_is_keyed_on_job_ids(cache):
+    cache.set_llm_answer('data scientist', JOB_IDS, 'explanation')
+
+    assert cache.get_llm_answer('data scientist', list(reversed(JOB_IDS))) == 'explanation'
+    assert cache.get_llm_answer('data scientist', JOB_IDS[:2]) is None
+    assert cache.get_llm_answer('data engineer', JOB_IDS) is None
+
+
+def test_index_version_change_invalidates_both_levels(cache, index_version):
+    cache.set_answer('nurse', 'answer')
+    cache.set_llm_answer('nurse', JOB_IDS, 'explanation')
+
+    index_version['current'] = 'v2'
+
+    assert cache.get_answer('nurse') is None
+    assert cache.get_llm_answer('nurse', JOB_IDS) is None
+
+
+def test_entries_expire_after_ttl(index_version):
+    client = LocalSharedClient()
+    cache = ResultCache(
+        answer_backend=InMemoryCacheBackend(maxsize=16, ttl=0.05),
+        llm_backend=SharedCacheBackend(client, 'llm', ttl=1),
+    )
+    cache.set_answer('nurse', 'answer')
+    cache.set_llm_answer('nurse', JOB_IDS, 'explanation')
+    assert cache.get_answer('nurse') == 'answer'
+    assert cache.get_llm_answer('nurse', JOB_IDS) == 'explanation'
+
+    time.sleep(0.1)
+    assert cache.get_answer('nurse') is None
+
+    time.sleep(1)
+    assert cache.get_llm_answer('nurse', JOB_IDS) is None
+
+
+def test_local_shared_client_honours_ex():
+    client = LocalSharedClient()
+    client.set('kept', 'value')
+    client.set('expiring', 'value', ex=1)
+
+    time.sleep(1.1)
+
+    assert client.get('kept') == b'value'
+    assert client.get('expiring') is None